@@ -0,0 +1,121 @@
+import random
+
+import numpy as np
+
+
+class ArrayMinesweeper():
+    """
+    Minesweeper game representation backed by NumPy arrays,
+    for very large boards (e.g. 1000x1000) in simulations.
+    Offers the same interface as minesweeper.Minesweeper.
+    """
+
+    def __init__(self, height=8, width=8, mines=8, seed=None):
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+
+        # Place mines by sampling cells without replacement
+        if seed is None:
+            seed = random.getrandbits(64)
+        rng = np.random.default_rng(seed)
+        positions = rng.choice(height * width, size=mines, replace=False)
+
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[positions] = True
+
+        # Count every cell's neighbouring mines at once: summing the eight
+        # shifted copies of the padded board is a 3x3 convolution
+        padded = np.pad(self.board, 1).astype(np.uint8)
+        self.counts = np.zeros((height, width), dtype=np.uint8)
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    self.counts += padded[di:di + height, dj:dj + width]
+
+        # Cells revealed so far by `reveal`, kept flat with a one-cell border
+        # (marked as already revealed) so that neighbour offsets never wrap
+        # around a row and the flood fill needs no bounds checks
+        self._stride = width + 2
+        self._opened = np.ones((height + 2) * self._stride, dtype=bool)
+        self.revealed = self._opened.reshape(height + 2, self._stride)[1:-1, 1:-1]
+        self.revealed[:] = False
+
+        self._zero = np.zeros((height + 2) * self._stride, dtype=bool)
+        self._zero.reshape(height + 2, self._stride)[1:-1, 1:-1] = (self.counts == 0) & ~self.board
+
+        stride = self._stride
+        self._offsets = np.array([-stride - 1, -stride, -stride + 1, -1,
+                                  1, stride - 1, stride, stride + 1])
+
+        self._mines = None
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    @property
+    def mines(self):
+        """
+        Set of mine cells, built on first use.
+        """
+        if self._mines is None:
+            self._mines = set(zip(*(axis.tolist() for axis in np.nonzero(self.board))))
+        return self._mines
+
+    def print(self):
+        """
+        Prints a text-based representation
+        of where mines are located.
+        """
+        for i in range(self.height):
+            print("--" * self.width + "-")
+            print("".join("|X" if mine else "| " for mine in self.board[i]) + "|")
+        print("--" * self.width + "-")
+
+    def is_mine(self, cell):
+        i, j = cell
+        return bool(self.board[i, j])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        i, j = cell
+        return int(self.counts[i, j])
+
+    def reveal(self, cell):
+        """
+        Reveals a safe cell and, if it has no neighbouring mines,
+        flood-fills the whole zero region around it and its border.
+        Returns the list of newly revealed cells.
+        """
+        i, j = cell
+        if self.board[i, j] or self.revealed[i, j]:
+            return []
+
+        start = (i + 1) * self._stride + (j + 1)
+        self._opened[start] = True
+        revealed = [np.array([start])]
+        frontier = revealed[0][self._zero[revealed[0]]]
+
+        # Expand one ring of neighbours at a time; a zero cell has no
+        # mine around it, so all of its neighbours are safe to reveal
+        while frontier.size > 0:
+            neighbors = (frontier[:, None] + self._offsets).ravel()
+            neighbors = np.unique(neighbors[~self._opened[neighbors]])
+            self._opened[neighbors] = True
+            revealed.append(neighbors)
+            frontier = neighbors[self._zero[neighbors]]
+
+        revealed = np.concatenate(revealed)
+        rows, columns = np.divmod(revealed, self._stride)
+        return list(zip((rows - 1).tolist(), (columns - 1).tolist()))
+
+    def won(self):
+        """
+        Checks if all mines have been flagged.
+        """
+        return self.mines_found == self.mines
@@ -1,4 +1,7 @@
+import collections
+import functools
 import itertools
+import math
 import random
 
 
@@ -101,6 +104,26 @@ class Sentence():
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def key(self):
+        """
+        Returns a hashable snapshot of the sentence, used to
+        deduplicate the knowledge base.
+        """
+        return (frozenset(self.cells), self.count)
+
+    def issubset(self, other):
+        """
+        Returns True if self.cells is a proper subset of other.cells.
+        """
+        return self.cells < other.cells
+
+    def difference(self, other):
+        """
+        Returns the sentence left after removing a subset `other`
+        (its cells and its mines) from this one.
+        """
+        return Sentence(self.cells - other.cells, self.count - other.count)
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
@@ -139,17 +162,123 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class BitSentence():
+    """
+    Compact variant of Sentence for large boards.
+    The cells are stored as an int bitmask over the board, where
+    cell (i, j) is bit i * width + j, so subset tests, differences
+    and counts are single integer operations.
+    """
+
+    __slots__ = ("mask", "count", "width")
+
+    def __init__(self, cells, count, width):
+        self.mask = 0
+        for i, j in cells:
+            self.mask |= 1 << (i * width + j)
+        self.count = count
+        self.width = width
+
+    @classmethod
+    def from_mask(cls, mask, count, width):
+        sentence = cls((), count, width)
+        sentence.mask = mask
+        return sentence
+
+    def __eq__(self, other):
+        return self.mask == other.mask and self.count == other.count
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    def __len__(self):
+        return bin(self.mask).count("1")
+
+    @property
+    def cells(self):
+        """
+        Decodes the bitmask into the set of (i, j) cells.
+        """
+        cells = set()
+        mask = self.mask
+        while mask:
+            lowest = mask & -mask
+            cells.add(divmod(lowest.bit_length() - 1, self.width))
+            mask ^= lowest
+        return cells
+
+    def key(self):
+        return (self.mask, self.count)
+
+    def issubset(self, other):
+        return self.mask != other.mask and self.mask & other.mask == self.mask
+
+    def difference(self, other):
+        return BitSentence.from_mask(self.mask & ~other.mask,
+                                     self.count - other.count, self.width)
+
+    def known_mines(self):
+        if self.count == len(self):
+            return self.cells
+
+        return None
+
+    def known_safes(self):
+        if self.count <= 0:
+            return self.cells
+
+        return None
+
+    def mark_mine(self, cell):
+        bit = 1 << (cell[0] * self.width + cell[1])
+        if self.mask & bit:
+            self.mask ^= bit
+            self.count -= 1
+
+    def mark_safe(self, cell):
+        bit = 1 << (cell[0] * self.width + cell[1])
+        if self.mask & bit:
+            self.mask ^= bit
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, compact=False, guess="random",
+                 enumeration_limit=24, samples=200, mines=None,
+                 endgame_threshold=40, density=0.1):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines on the board, if known
+        self.total_mines = mines
+
+        # Mine density assumed off the board's frontier when the total is
+        # unknown. Standard boards have about 12% to 21% mines; a lower prior
+        # wins more games, as a cell off the frontier also tends to open
+        # up new ground
+        self.density = density
+
+        # Store sentences as bitmasks (BitSentence) instead of sets of cells
+        self.compact = compact
+
+        # How to pick a move with no known safe cell: "random" or "probability"
+        self.guess = guess
+
+        # Frontier components with more cells than this are sampled, not enumerated
+        self.enumeration_limit = enumeration_limit
+        self.samples = samples
+
+        # Mine configurations of each frontier component, kept between moves
+        self.component_cache = dict()
+
+        # Solve exactly with the total mine count once at most this many cells are unknown
+        self.endgame_threshold = endgame_threshold
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -157,8 +286,83 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true, keyed by Sentence.key()
+        self.knowledge = dict()
+
+        # Map each cell to the sentences that mention it (keyed by id)
+        self.index = dict()
+
+        # Sentences that changed since they were last propagated
+        self.queue = collections.deque()
+        self.queued = set()
+
+    def add_sentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base, indexes it under every
+        cell it mentions and queues it for propagation.
+        Returns False if an identical sentence was already known.
+        """
+        key = sentence.key()
+        if key in self.knowledge:
+            return False
+
+        self.knowledge[key] = sentence
+        for cell in sentence.cells:
+            self.index.setdefault(cell, dict())[id(sentence)] = sentence
+
+        self.queue.append(sentence)
+        self.queued.add(id(sentence))
+        return True
+
+    def remove_sentence(self, sentence, key=None):
+        """
+        Removes a sentence from the knowledge base, the index and the queue.
+        `key` is the sentence's key when it was added, if it changed since.
+        """
+        if key is None:
+            key = sentence.key()
+        if self.knowledge.get(key) is sentence:
+            del self.knowledge[key]
+
+        for cell in sentence.cells:
+            sentences = self.index.get(cell)
+            if sentences is not None:
+                sentences.pop(id(sentence), None)
+                if len(sentences) == 0:
+                    del self.index[cell]
+
+        self.queued.discard(id(sentence))
+
+    def update_sentence(self, sentence, key):
+        """
+        Re-files a sentence whose cells or count just changed, where `key`
+        is its key before the change. Duplicates of known sentences are
+        dropped, anything else is queued to be propagated again.
+        """
+        if self.knowledge.get(key) is sentence:
+            del self.knowledge[key]
+
+        newKey = sentence.key()
+        if newKey in self.knowledge:
+            self.remove_sentence(sentence, key)
+            return
+
+        self.knowledge[newKey] = sentence
+        if id(sentence) not in self.queued:
+            self.queue.append(sentence)
+            self.queued.add(id(sentence))
+
+    def overlapping_sentences(self, sentence):
+        """
+        Returns the sentences, other than `sentence` itself,
+        that share at least one cell with it.
+        """
+        overlapping = dict()
+        for cell in sentence.cells:
+            overlapping.update(self.index.get(cell, dict()))
+
+        overlapping.pop(id(sentence), None)
+        return list(overlapping.values())
 
     def mark_mine(self, cell):
         """
@@ -166,8 +370,10 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for sentence in self.index.pop(cell, dict()).values():
+            key = sentence.key()
             sentence.mark_mine(cell)
+            self.update_sentence(sentence, key)
 
     def mark_safe(self, cell):
         """
@@ -175,36 +381,48 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        for sentence in self.index.pop(cell, dict()).values():
+            key = sentence.key()
             sentence.mark_safe(cell)
+            self.update_sentence(sentence, key)
 
-    def search_mines_n_safes(self):
+    def propagate(self):
         """
-        Iterate through knowledge searching for cells
-        that AI have certain that is a safe or a mine
-        cell and if find any, mark them.
+        Drain the queue of changed sentences. Each one either reveals
+        mines or safes (which change, and so queue, the sentences that
+        mention them) or is compared against the sentences it overlaps
+        to infer new, smaller sentences from subsets.
         """
+        while self.queue:
+            sentence = self.queue.popleft()
+            if id(sentence) not in self.queued:
+                continue  # Removed since it was queued
+            self.queued.discard(id(sentence))
+
+            minesFound = sentence.known_mines()
+            safeCells = sentence.known_safes()
+
+            if minesFound != None:
+                self.remove_sentence(sentence)
+                for mine in minesFound:
+                    self.mark_mine(mine)
+                continue
 
-        KnownMinesOrSafes = True
-
-        while KnownMinesOrSafes:
-            KnownMinesOrSafes = False
-
-            for sentence in self.knowledge:
-                minesFound = sentence.known_mines()
-                safeCells = sentence.known_safes()
-                if minesFound != None:
-                    for mine in minesFound:
-                        self.mark_mine(mine)
-
-                    self.knowledge.remove(sentence)
-                    KnownMinesOrSafes = True
-                elif safeCells != None:
-                    for safe in safeCells:
-                        self.mark_safe(safe)
+            if safeCells != None:
+                self.remove_sentence(sentence)
+                for safe in safeCells:
+                    self.mark_safe(safe)
+                continue
 
-                    KnownMinesOrSafes = True
-                    self.knowledge.remove(sentence)
+            # A superset is implied by its subset and their difference, so it is replaced by the difference
+            for other in self.overlapping_sentences(sentence):
+                if sentence.issubset(other):
+                    self.remove_sentence(other)
+                    self.add_sentence(other.difference(sentence))
+                elif other.issubset(sentence):
+                    self.remove_sentence(sentence)
+                    self.add_sentence(sentence.difference(other))
+                    break
 
     def add_knowledge(self, cell, count):
         """
@@ -234,7 +452,7 @@ class MinesweeperAI():
         for i in range(-1, 2):
             for j in range(-1, 2):
                 neighbor = (i + cell[0], j + cell[1])
-                if neighbor == cell or neighbor in self.moves_made or neighbor[0] > self.height - 1 or neighbor[1] > self.width - 1 or neighbor[0] < 0 or neighbor[1] < 0:
+                if neighbor == cell or neighbor in self.moves_made or neighbor in self.safes or neighbor[0] > self.height - 1 or neighbor[1] > self.width - 1 or neighbor[0] < 0 or neighbor[1] < 0:
                     continue
                 
                 if neighbor in self.mines:
@@ -243,49 +461,29 @@ class MinesweeperAI():
 
                 neighbor_cells.add(neighbor)
 
-        newKnowledge = Sentence(neighbor_cells, count)
-
-        self.knowledge.append(newKnowledge)
-
-        # 4
-        self.search_mines_n_safes()
-
-        # 5
-        haveNewKnowledge = True
-
-        while haveNewKnowledge:        
-            haveNewKnowledge = False
-            garbage = []
-
-            for i in range(len(self.knowledge)):
-                if i < len(self.knowledge) - 1:
-                    for j in range(i + 1, len(self.knowledge)):
-                        if self.knowledge[i].cells > self.knowledge[j].cells:
-                            newKnowledge = Sentence(self.knowledge[i].cells - self.knowledge[j].cells,
-                                                    self.knowledge[i].count - self.knowledge[j].count)
-                            self.knowledge.append(newKnowledge)
-
-                            if not self.knowledge[i] in garbage:
-                                garbage.append(self.knowledge[i])
-                            
-                            haveNewKnowledge = True
-                        elif self.knowledge[j].cells > self.knowledge[i].cells:
-                            newKnowledge = Sentence(self.knowledge[j].cells - self.knowledge[i].cells,
-                                                    self.knowledge[j].count - self.knowledge[i].count)
-                            self.knowledge.append(newKnowledge)
-
-                            if not self.knowledge[j] in garbage:
-                                garbage.append(self.knowledge[j])
-                                
-                            haveNewKnowledge = True
-                        elif self.knowledge[i].cells == self.knowledge[j].cells:
-                            if not self.knowledge[j] in garbage:
-                                garbage.append(self.knowledge[j])
-            
-            for item in garbage:
-                self.knowledge.remove(item)
+        if self.compact:
+            self.add_sentence(BitSentence(neighbor_cells, count, self.width))
+        else:
+            self.add_sentence(Sentence(neighbor_cells, count))
 
-            self.search_mines_n_safes()
+        # 4 and 5, only revisiting the sentences touched by this move
+        self.propagate()
+
+        # Settle whatever the total number of mines makes certain
+        while True:
+            solution = self.endgame()
+            if solution is None:
+                break
+
+            safes, mines, _, _ = solution
+            if len(safes) == 0 and len(mines) == 0:
+                break
+
+            for safe in safes:
+                self.mark_safe(safe)
+            for mine in mines:
+                self.mark_mine(mine)
+            self.propagate()
         
     def make_safe_move(self):
         """
@@ -305,6 +503,206 @@ class MinesweeperAI():
         
         return None
 
+    def frontier_components(self):
+        """
+        Splits the cells mentioned by the knowledge base into independent
+        components. Returns a list of (cells, sentences) pairs where no
+        sentence mentions cells from two different components.
+        """
+        components = []
+        seen = set()
+
+        for start in self.index:
+            if start in seen:
+                continue
+            seen.add(start)
+
+            # Breadth-first search, so neighbouring cells end up close in `cells`
+            cells = [start]
+            sentences = dict()
+            for cell in cells:
+                for sentence in self.index[cell].values():
+                    if id(sentence) in sentences:
+                        continue
+                    sentences[id(sentence)] = sentence
+                    for other in sentence.cells:
+                        if other not in seen:
+                            seen.add(other)
+                            cells.append(other)
+
+            components.append((cells, list(sentences.values())))
+
+        return components
+
+    def component_configurations(self, cells, sentences, exact=False):
+        """
+        Returns the mine configurations of a frontier component that are
+        consistent with its sentences, as a dictionary mapping a number
+        of mines k to a pair (number of configurations with k mines,
+        dictionary of cell -> how many of those have a mine in the cell).
+
+        Unless `exact` is True, components with more than
+        `self.enumeration_limit` cells are sampled with randomised
+        searches instead of fully enumerated. Each search keeps the first
+        configuration it finds, which does not draw configurations
+        uniformly, so probabilities derived from sampled counts are a
+        heuristic rather than exact frequencies.
+        """
+        position = {cell: n for n, cell in enumerate(cells)}
+        cellSentences = [[] for _ in cells]
+        need = []
+        left = []
+        for s, sentence in enumerate(sentences):
+            sentenceCells = sentence.cells
+            for cell in sentenceCells:
+                cellSentences[position[cell]].append(s)
+            need.append(sentence.count)
+            left.append(len(sentenceCells))
+
+        configurations = dict()
+        assignment = [0] * len(cells)
+        sampling = not exact and len(cells) > self.enumeration_limit
+
+        def record():
+            k = sum(assignment)
+            total, mines = configurations.setdefault(k, (0, dict()))
+            for n in range(len(cells)):
+                if assignment[n]:
+                    mines[cells[n]] = mines.get(cells[n], 0) + 1
+            configurations[k] = (total + 1, mines)
+
+        def search(n):
+            if n == len(cells):
+                record()
+                return True
+
+            values = [0, 1]
+            if sampling:
+                random.shuffle(values)
+
+            for value in values:
+                # Every sentence on this cell must still be satisfiable
+                if any(need[s] - value < 0 or need[s] - value > left[s] - 1
+                       for s in cellSentences[n]):
+                    continue
+
+                for s in cellSentences[n]:
+                    need[s] -= value
+                    left[s] -= 1
+                assignment[n] = value
+
+                found = search(n + 1)
+
+                assignment[n] = 0
+                for s in cellSentences[n]:
+                    need[s] += value
+                    left[s] += 1
+
+                # When sampling, stop at the first configuration found
+                if found and sampling:
+                    return True
+
+            return False
+
+        if not sampling:
+            search(0)
+        else:
+            for _ in range(self.samples):
+                search(0)
+
+        return configurations
+
+    def frontier_configurations(self, exact=False):
+        """
+        Returns a list of (cells, configurations) pairs, one for each
+        frontier component, reusing the configurations computed on
+        earlier moves for components that did not change.
+        """
+        results = []
+        cache = dict()
+
+        for cells, sentences in self.frontier_components():
+            enumerated = exact or len(cells) <= self.enumeration_limit
+            key = (frozenset(sentence.key() for sentence in sentences), enumerated)
+            configurations = self.component_cache.get(key)
+            if configurations is None:
+                configurations = self.component_configurations(cells, sentences, exact)
+            cache[key] = configurations
+            results.append((cells, configurations))
+
+        # Components that disappeared can't come back, so only keep the current ones
+        self.component_cache = cache
+
+        return results
+
+    def mine_probabilities(self, components=None):
+        """
+        Returns a dictionary mapping every frontier cell (a cell mentioned
+        by some sentence) to the probability that it is a mine, treating
+        every consistent configuration of its component as equally likely.
+        `components` defaults to `self.frontier_configurations()`.
+
+        For sampled components these are only estimates: see
+        `component_configurations`.
+        """
+        probabilities = dict()
+
+        if components is None:
+            components = self.frontier_configurations()
+
+        for cells, configurations in components:
+            total = sum(configurations[k][0] for k in configurations)
+            for cell in cells:
+                mines = sum(configurations[k][1].get(cell, 0) for k in configurations)
+                probabilities[cell] = mines / total if total > 0 else 0.5
+
+        return probabilities
+
+    def endgame(self):
+        """
+        Exact solver for the end of the game. Once the total number of
+        mines is known and at most `self.endgame_threshold` cells are
+        unknown (neither revealed nor known to be mines or safe), every
+        consistent configuration of the frontier is weighted by the number
+        of ways to place the remaining mines among the unknown cells off
+        the frontier.
+
+        Returns None if the solver is off, otherwise a tuple
+        (safes, mines, probabilities, interior) with the cells certain to
+        be safe, the cells certain to be mines, the probability of each
+        frontier cell being a mine, and the probability of any unknown
+        cell off the frontier being a mine.
+        """
+        if self.total_mines is None:
+            return None
+
+        unknown = self.height * self.width - len(self.safes) - len(self.mines)
+        if unknown > self.endgame_threshold:
+            return None
+
+        remaining = self.total_mines - len(self.mines)
+        components = self.frontier_configurations(exact=True)
+        interiorCells = unknown - sum(len(cells) for cells, _ in components)
+
+        solution = weigh_configurations(components, remaining, interiorCells)
+        if solution is None:
+            return None  # The mine count contradicts the knowledge base
+        probabilities, interior = solution
+
+        safes = {cell for cell, p in probabilities.items() if p == 0}
+        mines = {cell for cell, p in probabilities.items() if p == 1}
+
+        if interiorCells > 0 and interior in (0, 1):
+            certain = safes if interior == 0 else mines
+            for i in range(self.height):
+                for j in range(self.width):
+                    cell = (i, j)
+                    if (cell not in self.safes and cell not in self.mines
+                            and cell not in self.index):
+                        certain.add(cell)
+
+        return safes, mines, probabilities, interior
+
     def make_random_move(self):
         """
         Returns a move to make on the Minesweeper board.
@@ -315,13 +713,132 @@ class MinesweeperAI():
 
         if len(self.moves_made) >= (self.height * self.width) - 8:
             return None
-        
-        rng = random
 
-        while True:
-            move = (rng.randint(0, self.height - 1), rng.randint(0, self.width - 1))
+        candidates = [
+            (i, j)
+            for i in range(self.height)
+            for j in range(self.width)
+            if (i, j) not in self.moves_made and (i, j) not in self.mines
+        ]
 
-            if move in self.moves_made or move in self.mines:
-                continue
+        if len(candidates) == 0:
+            return None
 
-            return move
+        if self.guess != "probability":
+            return random.choice(candidates)
+
+        # Pick the cell least likely to be a mine, exactly in the endgame.
+        # Otherwise, if the total is known, configurations are weighted by
+        # the ways to place the other mines off the frontier, as in the
+        # endgame. If it is not, a cell off the frontier is taken to be a
+        # mine with the board's typical density, and compared with the
+        # frontier cells' probabilities.
+        solution = self.endgame()
+        if solution is not None:
+            _, _, probabilities, interior = solution
+        else:
+            components = self.frontier_configurations()
+            solution = None
+            if self.total_mines is not None:
+                unknown = self.height * self.width - len(self.safes) - len(self.mines)
+                interiorCells = unknown - sum(len(cells) for cells, _ in components)
+                solution = weigh_configurations(components, self.total_mines - len(self.mines), interiorCells)
+
+            if solution is not None:
+                probabilities, interior = solution
+            else:
+                probabilities = self.mine_probabilities(components)
+
+                # Mines the typical density leaves for the cells off the
+                # frontier, once the known and expected frontier mines are out
+                interior = self.density
+                unknown = self.height * self.width - len(self.safes) - len(self.mines)
+                interiorCells = unknown - len(probabilities)
+                if interiorCells > 0:
+                    expected = self.density * self.height * self.width - len(self.mines) - sum(probabilities.values())
+                    interior = min(max(expected / interiorCells, 0.0), 1.0)
+
+        lowest = min(probabilities.get(cell, interior) for cell in candidates)
+
+        return random.choice([
+            cell for cell in candidates
+            if probabilities.get(cell, interior) <= lowest + 1e-9
+        ])
+
+
+@functools.lru_cache(maxsize=None)
+def combinations(n, k):
+    """
+    Returns the number of ways to choose k of n cells (0 if impossible).
+    """
+    if k < 0 or k > n:
+        return 0
+    return math.comb(n, k)
+
+
+def weigh_configurations(components, remaining, interiorCells):
+    """
+    Given (cells, configurations) pairs for the frontier components, the
+    number of mines not yet known and the number of unknown cells off the
+    frontier, weights every frontier configuration by the number of ways
+    to place the other mines off the frontier.
+
+    Returns a pair (probability of each frontier cell being a mine,
+    probability of a cell off the frontier being a mine), or None if no
+    configuration fits the mine count. Probabilities are exact fractions
+    of the weights, so certain cells come out as exactly 0 or 1.
+    """
+
+    # Ways to place the mines the frontier doesn't hold off the frontier
+    def ways(frontierMines):
+        return combinations(interiorCells, remaining - frontierMines)
+
+    distributions = [
+        {k: configurations[k][0] for k in configurations}
+        for _, configurations in components
+    ]
+    frontier = convolve(distributions)
+
+    total = sum(count * ways(k) for k, count in frontier.items())
+    if total == 0:
+        return None
+
+    probabilities = dict()
+    for c, (cells, configurations) in enumerate(components):
+        others = convolve(distributions[:c] + distributions[c + 1:])
+        weight = {
+            k: sum(count * ways(k + m) for m, count in others.items())
+            for k in configurations
+        }
+
+        for cell in cells:
+            mineWeight = sum(configurations[k][1].get(cell, 0) * weight[k] for k in configurations)
+            probabilities[cell] = 0 if mineWeight == 0 else 1 if mineWeight == total else mineWeight / total
+
+    interior = 0.0
+    if interiorCells > 0:
+        interiorWeight = sum(count * ways(k) * (remaining - k) for k, count in frontier.items())
+        if interiorWeight == 0:
+            interior = 0
+        elif interiorWeight == total * interiorCells:
+            interior = 1
+        else:
+            interior = interiorWeight / (total * interiorCells)
+
+    return probabilities, interior
+
+
+def convolve(distributions):
+    """
+    Given dictionaries mapping a number of mines to a number of
+    configurations, one per independent component, returns the same
+    dictionary for all of the components together.
+    """
+    total = {0: 1}
+    for distribution in distributions:
+        combined = dict()
+        for a, x in total.items():
+            for b, y in distribution.items():
+                combined[a + b] = combined.get(a + b, 0) + x * y
+        total = combined
+    return total
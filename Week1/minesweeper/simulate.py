@@ -0,0 +1,163 @@
+import argparse
+import multiprocessing
+import random
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play Minesweeper games headless with MinesweeperAI "
+                    "and report win rate and speed."
+    )
+    parser.add_argument("-n", "--games", type=int, default=1000,
+                        help="games per board configuration")
+    parser.add_argument("--size", nargs="+", default=["8x8"],
+                        help="board sizes as HEIGHTxWIDTH, e.g. 8x8 16x30")
+    parser.add_argument("--density", nargs="+", type=float, default=[0.125],
+                        help="fractions of the board that are mines")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--guess", choices=["random", "probability"],
+                        default="random")
+    parser.add_argument("--compact", action="store_true",
+                        help="store sentences as bitmasks")
+    parser.add_argument("--tell-mines", action="store_true",
+                        help="tell the AI the total number of mines")
+    parser.add_argument("--board", choices=["list", "array"], default="list",
+                        help="use the NumPy-backed board for large sizes")
+    parser.add_argument("--flood", action="store_true",
+                        help="reveal whole zero regions at once (array board)")
+    args = parser.parse_args()
+
+    if args.flood and args.board != "array":
+        parser.error("--flood needs --board array")
+
+    options = {"compact": args.compact, "guess": args.guess}
+    board = {"type": args.board, "flood": args.flood}
+
+    print(f"{'board':>10} {'mines':>6} {'games':>6} {'win rate':>9} "
+          f"{'moves/s':>9} {'ms/move':>8} {'kb p50':>7} {'kb p90':>7} "
+          f"{'kb p99':>7} {'kb max':>7}")
+
+    with multiprocessing.Pool(args.processes) as pool:
+        for size in args.size:
+            height, width = (int(n) for n in size.lower().split("x"))
+            for density in args.density:
+                mines = max(1, round(height * width * density))
+                report = simulate(pool, height, width, mines, args.games,
+                                  args.seed, options, args.tell_mines, board)
+                print(f"{size:>10} {mines:>6} {report['games']:>6} "
+                      f"{report['win_rate']:>9.3f} {report['moves_per_second']:>9.0f} "
+                      f"{report['ms_per_move']:>8.3f} {report['knowledge'][50]:>7} "
+                      f"{report['knowledge'][90]:>7} {report['knowledge'][99]:>7} "
+                      f"{report['knowledge'][100]:>7}")
+
+
+def simulate(pool, height, width, mines, games, seed, options,
+             tell_mines=False, board=None):
+    """
+    Play `games` games on a `height` x `width` board with `mines` mines
+    across the worker `pool` and return a dictionary summarising them.
+    """
+    if board is None:
+        board = {"type": "list", "flood": False}
+
+    jobs = [
+        (height, width, mines, seed + game, options, tell_mines, board)
+        for game in range(games)
+    ]
+
+    won = 0
+    moves = 0
+    seconds = 0.0
+    inference = 0.0
+    knowledge = []
+    for result in pool.imap_unordered(play, jobs, chunksize=max(1, games // 64)):
+        won += result["won"]
+        moves += result["moves"]
+        seconds += result["seconds"]
+        inference += result["inference"]
+        knowledge.extend(result["knowledge"])
+
+    return {
+        "games": games,
+        "win_rate": won / games,
+        "moves_per_second": moves / seconds if seconds > 0 else 0.0,
+        "ms_per_move": 1000 * inference / moves if moves > 0 else 0.0,
+        "knowledge": {p: percentile(knowledge, p) for p in (50, 90, 99, 100)}
+    }
+
+
+def play(job):
+    """
+    Play a single game and return whether it was won, how many moves
+    were made, the time spent playing and in `add_knowledge`, and the
+    size of the knowledge base after every move.
+    """
+    height, width, mines, seed, options, tell_mines, board = job
+
+    random.seed(seed)
+    if board["type"] == "array":
+        from arrayboard import ArrayMinesweeper
+        game = ArrayMinesweeper(height=height, width=width, mines=mines)
+    else:
+        game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width,
+                       mines=mines if tell_mines else None, **options)
+
+    revealed = 0
+    inference = 0.0
+    knowledge = []
+    won = False
+
+    start = time.perf_counter()
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+            if move is None:
+                won = revealed == height * width - mines
+                break
+
+        if game.is_mine(move):
+            break
+
+        cells = game.reveal(move) if board["flood"] else [move]
+        for cell in cells:
+            nearby = game.nearby_mines(cell)
+            before = time.perf_counter()
+            ai.add_knowledge(cell, nearby)
+            inference += time.perf_counter() - before
+
+            revealed += 1
+            knowledge.append(len(ai.knowledge))
+
+        if revealed == height * width - mines:
+            won = True
+            break
+
+    return {
+        "won": won,
+        "moves": revealed,
+        "seconds": time.perf_counter() - start,
+        "inference": inference,
+        "knowledge": knowledge
+    }
+
+
+def percentile(values, p):
+    """
+    Return the `p`th percentile of `values` (nearest rank), or 0 if empty.
+    """
+    if len(values) == 0:
+        return 0
+    values = sorted(values)
+    rank = max(1, -(-p * len(values) // 100))
+    return values[rank - 1]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from heredity import load_data, pedigree_components
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run heredity inference on many families across a "
+                    "process pool and stream the results."
+    )
+    parser.add_argument("paths", nargs="+",
+                        help="family CSV files, multi-family CSV files or directories of them")
+    parser.add_argument("--method", choices=list(METHODS), default="elimination")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv",
+                        help="one CSV row per person, or one JSON line per family")
+    parser.add_argument("--output", default=None,
+                        help="file to write results to (default: standard output)")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunksize", type=int, default=16,
+                        help="families sent to a worker at a time")
+    args = parser.parse_args()
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        write = writer(out, args.format)
+        start = time.perf_counter()
+        count = 0
+        with multiprocessing.Pool(args.processes) as pool:
+            jobs = ((family, people, args.method) for family, people in families(args.paths))
+            for result in pool.imap_unordered(infer, jobs, args.chunksize):
+                write(result)
+                count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"{count} families in {time.perf_counter() - start:.3f} seconds", file=sys.stderr)
+
+
+def families(paths):
+    """
+    Yield a name and the persons of every independent family in the CSV
+    files `paths`, where directories stand for every CSV file in them.
+    A file holding one family is named after the file, and the families
+    of a multi-family file are numbered after it.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(
+                entry.path for entry in os.scandir(path)
+                if entry.name.endswith(".csv")
+            )
+        else:
+            files = [path]
+
+        for filename in files:
+            components = pedigree_components(load_data(filename))
+            for i, people in enumerate(components):
+                yield (filename if len(components) == 1 else f"{filename}#{i}"), people
+
+
+def elimination_marginals(people):
+    from elimination import marginals
+    return marginals(people)
+
+
+def vectorized_marginals(people):
+    from vectorized import marginals
+    return marginals(people)
+
+
+def gibbs_marginals(people):
+    from sampling import gibbs
+    return gibbs(people)[0]
+
+
+# Inference methods, by name
+METHODS = {
+    "elimination": elimination_marginals,
+    "vectorized": vectorized_marginals,
+    "gibbs": gibbs_marginals
+}
+
+
+def infer(job):
+    """
+    Run inference on a single family and return its name, its persons'
+    probabilities and the seconds it took.
+    """
+    family, people, method = job
+    start = time.perf_counter()
+    probabilities = METHODS[method](people)
+    return {
+        "family": family,
+        "people": probabilities,
+        "seconds": time.perf_counter() - start
+    }
+
+
+def writer(out, format):
+    """
+    Return a function writing one family's result to the open file
+    `out` as CSV rows or a JSON line, flushed as soon as it is written.
+    """
+    if format == "json":
+        def write(result):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+        return write
+
+    rows = csv.writer(out)
+    rows.writerow(["family", "person", "gene_2", "gene_1", "gene_0", "trait", "seconds"])
+
+    def write(result):
+        for person, probabilities in result["people"].items():
+            genes = probabilities["gene"]
+            rows.writerow([
+                result["family"], person,
+                f"{genes[2]:.4f}", f"{genes[1]:.4f}", f"{genes[0]:.4f}",
+                f"{probabilities['trait'][True]:.4f}", f"{result['seconds']:.6f}"
+            ])
+        out.flush()
+    return write
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import itertools
+import sys
+
+import heredity
+from heredity import load_data, print_probabilities
+
+# Values each person's gene variable can take
+GENES = (0, 1, 2)
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python elimination.py data.csv")
+    people = load_data(sys.argv[1])
+    probabilities = marginals(people)
+
+    print_probabilities(people, probabilities)
+
+
+class Factor():
+    """
+    Table of non-negative values over gene variables, where `variables`
+    is a tuple of person names and `table` maps each tuple of their gene
+    counts to a value.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    @classmethod
+    def unit(cls, variables):
+        return cls(variables, {
+            genes: 1.0 for genes in itertools.product(GENES, repeat=len(variables))
+        })
+
+    def __mul__(self, other):
+        """
+        Return the product of two factors, over the union of their variables.
+        """
+        variables = self.variables + tuple(v for v in other.variables if v not in self.variables)
+        mine = [variables.index(v) for v in self.variables]
+        theirs = [variables.index(v) for v in other.variables]
+
+        table = dict()
+        for genes in itertools.product(GENES, repeat=len(variables)):
+            table[genes] = (self.table[tuple(genes[i] for i in mine)] *
+                            other.table[tuple(genes[i] for i in theirs)])
+        return Factor(variables, table)
+
+    def __truediv__(self, other):
+        """
+        Return this factor divided by a factor over a subset of its
+        variables, with 0 / 0 taken as 0.
+        """
+        theirs = [self.variables.index(v) for v in other.variables]
+
+        table = dict()
+        for genes, value in self.table.items():
+            divisor = other.table[tuple(genes[i] for i in theirs)]
+            table[genes] = value / divisor if divisor > 0 else 0.0
+        return Factor(self.variables, table)
+
+    def normalized(self):
+        """
+        Return the factor scaled to sum to 1, so long products of small
+        probabilities do not underflow.
+        """
+        total = sum(self.table.values())
+        if total == 0:
+            return self
+        return Factor(self.variables, {genes: value / total for genes, value in self.table.items()})
+
+    def marginal(self, variables):
+        """
+        Return the factor summed over every variable not in `variables`.
+        """
+        variables = tuple(v for v in self.variables if v in variables)
+        keep = [self.variables.index(v) for v in variables]
+
+        table = {genes: 0.0 for genes in itertools.product(GENES, repeat=len(variables))}
+        for genes, value in self.table.items():
+            table[tuple(genes[i] for i in keep)] += value
+        return Factor(variables, table)
+
+
+def pedigree_factors(people, probs):
+    """
+    Return one factor per person: the probability of their genes given
+    their parents' genes (or unconditionally, for founders), times the
+    probability of their trait if it is known.
+    """
+    inheritance, trait = heredity.probability_tables(probs)
+    factors = dict()
+
+    for person in people:
+        known = people[person]["trait"]
+
+        def evidence(genes):
+            return 1.0 if known is None else trait[genes][known]
+
+        mother, father = people[person]["mother"], people[person]["father"]
+        if mother is None:
+            factors[person] = Factor((person,), {
+                (genes,): probs["gene"][genes] * evidence(genes) for genes in GENES
+            })
+        else:
+            factors[person] = Factor((mother, father, person), {
+                (m, f, genes): inheritance[m][f][genes] * evidence(genes)
+                for m, f, genes in itertools.product(GENES, repeat=3)
+            })
+
+    return factors
+
+
+def elimination_order(people):
+    """
+    Return the persons in a greedy min-fill elimination order of the
+    moral graph (each person joined to their parents, and both parents
+    of a child joined to each other), together with the neighbours each
+    person had when eliminated.
+    """
+    graph = {person: set() for person in people}
+    for person in people:
+        family = [p for p in (person, people[person]["mother"], people[person]["father"]) if p]
+        for a, b in itertools.combinations(family, 2):
+            graph[a].add(b)
+            graph[b].add(a)
+
+    def fill(person):
+        return sum(1 for a, b in itertools.combinations(graph[person], 2) if b not in graph[a])
+
+    order = []
+    while graph:
+        person = min(graph, key=lambda p: (fill(p), len(graph[p])))
+        neighbours = graph.pop(person)
+        for a, b in itertools.combinations(neighbours, 2):
+            graph[a].add(b)
+            graph[b].add(a)
+        for neighbour in neighbours:
+            graph[neighbour].discard(person)
+        order.append((person, neighbours))
+
+    return order
+
+
+def junction_tree(people, probs):
+    """
+    Compile the pedigree into a junction tree: eliminating persons in
+    min-fill order yields one clique per person, the person followed by
+    its neighbours when eliminated, linked to the clique of the next
+    eliminated person it contains. Every person's factor is placed in a
+    clique covering it, and one upward pass of sum-product messages,
+    leaves first, leaves each clique with the product of the factors of
+    its subtree summed over the persons eliminated before it.
+
+    Return the cliques, the index of each clique's parent clique (None
+    for roots), the clique potentials after the upward pass and the
+    message each clique sent its parent.
+    """
+    order = elimination_order(people)
+    position = {person: i for i, (person, _) in enumerate(order)}
+
+    # Clique of every eliminated person, and the clique it sends its message to
+    cliques = [(person,) + tuple(sorted(neighbours, key=position.get)) for person, neighbours in order]
+    parents = [position[clique[1]] if len(clique) > 1 else None for clique in cliques]
+    children = [[] for _ in cliques]
+    for i, parent in enumerate(parents):
+        if parent is not None:
+            children[parent].append(i)
+
+    # A person's factor goes to the clique of its first eliminated variable,
+    # which contains the whole family
+    potentials = [Factor.unit(clique) for clique in cliques]
+    for person, factor in pedigree_factors(people, probs).items():
+        first = min(position[v] for v in factor.variables)
+        potentials[first] = potentials[first] * factor
+
+    # Upward pass, in elimination order: leaves first. Beliefs are rescaled
+    # as they go, which only changes every message by a constant
+    upward = [None] * len(cliques)
+    for i in range(len(cliques)):
+        belief = potentials[i]
+        for child in children[i]:
+            belief = belief * upward[child]
+        potentials[i] = belief.normalized()
+        if parents[i] is not None:
+            upward[i] = potentials[i].marginal(cliques[parents[i]])
+
+    return cliques, parents, potentials, upward
+
+
+def marginals(people, probs=None):
+    """
+    Return every person's gene and trait distribution given the known
+    traits, in the same format as heredity.main's `probabilities`.
+
+    After the upward pass of `junction_tree`, one downward pass of
+    messages leaves each clique with the joint of its persons and the
+    evidence. For tree-like pedigrees cliques have at most a few persons,
+    so message passing grows linearly with the family.
+    """
+    if probs is None:
+        probs = heredity.PROBS
+
+    trait = heredity.probability_tables(probs)[1]
+    cliques, parents, potentials, upward = junction_tree(people, probs)
+    position = {clique[0]: i for i, clique in enumerate(cliques)}
+    potentials = list(potentials)
+
+    # Downward pass, in reverse elimination order: roots first
+    for i in reversed(range(len(cliques))):
+        if parents[i] is not None:
+            message = potentials[parents[i]].marginal(cliques[i]) / upward[i]
+            potentials[i] = (potentials[i] * message).normalized()
+
+    probabilities = dict()
+    for person in people:
+        genes = potentials[position[person]].marginal((person,)).table
+        total = sum(genes.values())
+        gene = {value: genes[(value,)] / total for value in (2, 1, 0)}
+
+        known = people[person]["trait"]
+        if known is None:
+            has_trait = sum(gene[value] * trait[value][True] for value in GENES)
+        else:
+            has_trait = 1.0 if known else 0.0
+
+        probabilities[person] = {
+            "gene": gene,
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+
+    return probabilities
+
+
+if __name__ == "__main__":
+    main()
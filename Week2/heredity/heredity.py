@@ -1,5 +1,5 @@
 import csv
-import itertools
+import functools
 import sys
 
 PROBS = {
@@ -44,6 +44,36 @@ def main():
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
 
+    # Persons in different families are independent, so each family is
+    # enumerated on its own and the cost is a sum rather than a product
+    probabilities = dict()
+    for family in pedigree_components(people):
+        probabilities.update(enumerate_probabilities(family))
+
+    # Print results
+    print_probabilities(people, probabilities)
+
+
+def print_probabilities(people, probabilities):
+    """
+    Print every person's gene and trait distribution in `probabilities`,
+    in the order of `people`.
+    """
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Return every person's gene and trait distribution given the known
+    traits, by summing the joint probability of every assignment.
+    """
+
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -60,38 +90,20 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
+    # Loop over every assignment that agrees with the known traits
+    names = list(people)
+    for one_gene, two_genes, have_trait in assignments(people):
 
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
+        # Update probabilities with new joint probability
+        one_gene, two_genes, have_trait = (
+            members(names, mask) for mask in (one_gene, two_genes, have_trait)
         )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+        p = joint_probability(people, one_gene, two_genes, have_trait)
+        update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
@@ -116,16 +128,130 @@ def load_data(filename):
     return data
 
 
-def powerset(s):
+def pedigree_components(people):
     """
-    Return a list of all possible subsets of set s.
+    Split `people` into its independent families: groups of persons
+    connected to each other through parents and children.
+    Return a list of dictionaries in the format of load_data, each
+    keeping the order of `people`.
     """
-    s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    relatives = {person: set() for person in people}
+    for person in people:
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent is not None:
+                relatives[person].add(parent)
+                relatives[parent].add(person)
+
+    order = {person: i for i, person in enumerate(people)}
+    components = []
+    seen = set()
+    for person in people:
+        if person in seen:
+            continue
+
+        # Collect everyone reachable from this person
+        family = {person}
+        frontier = [person]
+        while frontier:
+            for relative in relatives[frontier.pop()]:
+                if relative not in family:
+                    family.add(relative)
+                    frontier.append(relative)
+
+        seen |= family
+        components.append({name: people[name] for name in sorted(family, key=order.get)})
+
+    return components
+
+
+def submasks(mask):
+    """
+    Yield every subset of the bits set in `mask`, as an integer, from
+    `mask` itself down to 0.
+    """
+    subset = mask
+    while True:
+        yield subset
+        if subset == 0:
+            return
+        subset = (subset - 1) & mask
+
+
+def assignments(people):
+    """
+    Lazily yield every (one_gene, two_genes, have_trait) assignment that
+    agrees with the known traits, as integer masks where bit i stands
+    for the i-th person of `people`.
+
+    Known traits are fixed up front, so only the 2 ** unknown trait
+    assignments of the persons without one are generated.
+    """
+    names = list(people)
+    everyone = (1 << len(names)) - 1
+    known = sum(1 << i for i, person in enumerate(names) if people[person]["trait"])
+    unknown = sum(1 << i for i, person in enumerate(names) if people[person]["trait"] is None)
+
+    for traits in submasks(unknown):
+        for one_gene in submasks(everyone):
+            for two_genes in submasks(everyone & ~one_gene):
+                yield one_gene, two_genes, known | traits
+
+
+def members(names, mask):
+    """
+    Return the set of names whose bit is set in `mask`.
+    """
+    return {name for i, name in enumerate(names) if mask >> i & 1}
+
+
+def fingerprint(probs):
+    """
+    Return the values of `probs` as a tuple, which changes whenever any
+    of them is changed.
+    """
+    return (
+        tuple(probs["gene"][genes] for genes in range(3)),
+        tuple((probs["trait"][genes][False], probs["trait"][genes][True]) for genes in range(3)),
+        probs["mutation"]
+    )
+
+
+@functools.lru_cache(maxsize=16)
+def build_tables(values):
+    """
+    Return the inheritance and trait tables for the PROBS values given
+    by `fingerprint`.
+    """
+    _, traits, mutation = values
+
+    # Probability that a parent with that many copies passes the gene on
+    passes = [mutation, 0.5, 1 - mutation]
+
+    inheritance = [[[0.0] * 3 for _ in range(3)] for _ in range(3)]
+    for mother in range(3):
+        for father in range(3):
+            m, f = passes[mother], passes[father]
+            inheritance[mother][father][0] = (1 - m) * (1 - f)
+            inheritance[mother][father][1] = m * (1 - f) + f * (1 - m)
+            inheritance[mother][father][2] = m * f
+
+    trait = [list(traits[genes]) for genes in range(3)]
+    return inheritance, trait
+
+
+def probability_tables(probs=None):
+    """
+    Return two tables derived from `probs` (PROBS by default):
+    inheritance[mother genes][father genes][child genes], the
+    probability of a child having that many copies given its parents',
+    and trait[genes][has trait], the probability of the trait showing.
+
+    Tables are memoised on the values of `probs`, so they are built
+    once and rebuilt only after PROBS is changed.
+    """
+    if probs is None:
+        probs = PROBS
+    return build_tables(fingerprint(probs))
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -137,106 +263,35 @@ def joint_probability(people, one_gene, two_genes, have_trait):
     #     * everyone not in `one_gene` or `two_gene` does not have the gene, and
     #     * everyone in set `have_trait` has the trait, and
     #     * everyone not in set` have_trait` does not have the trait.
-    
-    probability = 0.0
-    
-    # Dictionary to store variables from the analyzed scenario
-    scenario = dict()
 
+    inheritance, trait = probability_tables()
+
+    # Number of copies of the gene each person has in the analyzed scenario
+    genes = dict()
     for person in people:
-        scenario[person] = dict()
-        
         if person in one_gene:
-            scenario[person]["gene"] = 1
+            genes[person] = 1
         elif person in two_genes:
-            scenario[person]["gene"] = 2
+            genes[person] = 2
         else:
-            scenario[person]["gene"] = 0
+            genes[person] = 0
 
-        if person in have_trait:
-            scenario[person]["trait"] = True
-        else:
-            scenario[person]["trait"] = False
-
-        scenario[person]["probability"] = 0.0
-    
-    # Iterate through all people to attach the probabilities of the given scenario variables
+    probability = 1.0
     for person in people:
-        # Attaching the probabilities of genes
-        if person in one_gene:
-            if people[person]["mother"] == None:
-                scenario[person]["probability"] = PROBS["gene"][1]
-            else:
-                get_gene_probability = create_get_gene_probability(scenario, person, people)
-
-                scenario[person]["probability"] = get_gene_probability["mother"][True] * get_gene_probability["father"][False] + get_gene_probability["father"][True] * get_gene_probability["mother"][False]
-        elif person in two_genes:
-            if people[person]["mother"] == None:
-                scenario[person]["probability"] = PROBS["gene"][2]
-            else:
-                get_gene_probability = create_get_gene_probability(scenario, person, people)
+        mother, father = people[person]["mother"], people[person]["father"]
 
-                scenario[person]["probability"] = get_gene_probability["mother"][True] * get_gene_probability["father"][True]
+        # Multiply the probability of the person's genes, given their parents' if known
+        if mother is None:
+            probability *= PROBS["gene"][genes[person]]
         else:
-            if people[person]["mother"] == None:
-                scenario[person]["probability"] = PROBS["gene"][0]
-            else:
-                get_gene_probability = create_get_gene_probability(scenario, person, people)
+            probability *= inheritance[genes[mother]][genes[father]][genes[person]]
 
-                scenario[person]["probability"] = get_gene_probability["mother"][False] * get_gene_probability["father"][False]
+        # Multiply the probability of the person's trait given their genes
+        probability *= trait[genes[person]][person in have_trait]
 
-        # Attaching the probabilities of trait
-        if person in have_trait:
-            scenario[person]["probability"] *= PROBS["trait"][scenario[person]["gene"]][True]
-        else:
-            scenario[person]["probability"] *= PROBS["trait"][scenario[person]["gene"]][False]
-
-    # Multiply all attached probabilities to found the probability of this scenario happen
-    for person in scenario:
-        probability = probability * scenario[person]["probability"] if probability > 0 else scenario[person]["probability"]
-        
     return probability
 
 
-def create_get_gene_probability(scenario, person, people):
-    # Create a dictionary to store the probabilities of the mother and father
-    # of a given person pass or not a gene that cause the trait on a given scenario
-    get_gene_probability = {
-        "mother": {
-            True: 0.0,
-            False: 0.0
-        },
-
-        "father": {
-            True: 0.0,
-            False: 0.0
-        }
-    }
-
-    # Fill this dictionary with the given informations
-    if scenario[people[person]["mother"]]["gene"] == 2:
-        get_gene_probability["mother"][True] = 1 - PROBS["mutation"]
-        get_gene_probability["mother"][False] = PROBS["mutation"]
-    elif scenario[people[person]["mother"]]["gene"] == 1:
-        get_gene_probability["mother"][True] = 0.5
-        get_gene_probability["mother"][False] = 0.5
-    else:
-        get_gene_probability["mother"][True] = PROBS["mutation"]
-        get_gene_probability["mother"][False] = 1 - PROBS["mutation"]
-
-    if scenario[people[person]["father"]]["gene"] == 2:
-        get_gene_probability["father"][True] = 1 - PROBS["mutation"]
-        get_gene_probability["father"][False] = PROBS["mutation"]
-    elif scenario[people[person]["father"]]["gene"] == 1:
-        get_gene_probability["father"][True] = 0.5
-        get_gene_probability["father"][False] = 0.5
-    else:
-        get_gene_probability["father"][True] = PROBS["mutation"]
-        get_gene_probability["father"][False] = 1 - PROBS["mutation"]
-
-    return get_gene_probability
-
-
 def update(probabilities, one_gene, two_genes, have_trait, p):
     # Add to `probabilities` a new joint probability `p`.
     # Each person should have their "gene" and "trait" distributions updated.
@@ -0,0 +1,363 @@
+import sys
+
+import numpy as np
+
+import heredity
+from heredity import load_data, print_probabilities
+from vectorized import tables
+
+# Estimated probabilities are accepted once their standard error is below this
+TOLERANCE = 0.005
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python sampling.py data.csv|size [likelihood|gibbs] [tolerance]")
+    method = sys.argv[2] if len(sys.argv) > 2 else "gibbs"
+    tolerance = float(sys.argv[3]) if len(sys.argv) > 3 else TOLERANCE
+    if method not in METHODS:
+        sys.exit(f"Unknown method {method}, expected one of {', '.join(METHODS)}")
+
+    # A number instead of a file checks the method on a generated pedigree
+    if sys.argv[1].isdigit():
+        diagnostics, error = check(int(sys.argv[1]), method, tolerance)
+        for name, value in diagnostics.items():
+            print(f"{name}: {value:.4g}" if isinstance(value, float) else f"{name}: {value}")
+        print(f"largest error: {error:.4f}")
+        if not diagnostics["converged"] or error > 4 * tolerance:
+            sys.exit(1)
+        return
+
+    people = load_data(sys.argv[1])
+
+    probabilities, diagnostics = METHODS[method](people, tolerance)
+
+    print_probabilities(people, probabilities)
+    print("Diagnostics:")
+    for name, value in diagnostics.items():
+        print(f"  {name}: {value:.4g}" if isinstance(value, float) else f"  {name}: {value}")
+
+
+class Pedigree():
+    """
+    The persons of `people` as array indices: a parents-first order,
+    each person's parents (-1 for founders) and children, and the known
+    traits (-1 where unknown).
+    """
+
+    def __init__(self, people):
+        self.names = list(people)
+        column = {person: i for i, person in enumerate(self.names)}
+        n = len(self.names)
+
+        self.mothers = np.array([column.get(people[p]["mother"], -1) for p in self.names], dtype=np.intp)
+        self.fathers = np.array([column.get(people[p]["father"], -1) for p in self.names], dtype=np.intp)
+        self.traits = np.array([
+            -1 if people[p]["trait"] is None else int(people[p]["trait"]) for p in self.names
+        ], dtype=np.intp)
+        self.known = np.flatnonzero(self.traits >= 0)
+
+        self.children = [[] for _ in range(n)]
+        for child in range(n):
+            if self.mothers[child] >= 0:
+                self.children[self.mothers[child]].append(child)
+                self.children[self.fathers[child]].append(child)
+
+        # Parents before children
+        self.order = []
+        placed = np.zeros(n, dtype=bool)
+        while len(self.order) < n:
+            for i in range(n):
+                if not placed[i] and (self.mothers[i] < 0 or (placed[self.mothers[i]] and placed[self.fathers[i]])):
+                    self.order.append(i)
+                    placed[i] = True
+
+    def __len__(self):
+        return len(self.names)
+
+    def probabilities(self, genes, has_trait):
+        """
+        Return estimated gene distributions, given as an array of
+        probabilities indexed by (person, genes), and trait
+        probabilities in the format of heredity.main's `probabilities`.
+        """
+        return {
+            person: {
+                "gene": {value: float(genes[i, value]) for value in (2, 1, 0)},
+                "trait": {True: float(has_trait[i]), False: float(1 - has_trait[i])}
+            }
+            for i, person in enumerate(self.names)
+        }
+
+
+def sample_prior(pedigree, gene, inheritance, size, rng):
+    """
+    Return `size` gene assignments drawn from PROBS, parents first,
+    ignoring the known traits.
+    """
+    genes = np.empty((size, len(pedigree)), dtype=np.intp)
+    for i in pedigree.order:
+        if pedigree.mothers[i] < 0:
+            distribution = np.broadcast_to(gene, (size, 3))
+        else:
+            distribution = inheritance[genes[:, pedigree.mothers[i]], genes[:, pedigree.fathers[i]]]
+        drawn = (rng.random((size, 1)) > distribution.cumsum(axis=1)).sum(axis=1)
+        genes[:, i] = np.minimum(drawn, 2)
+    return genes
+
+
+def trait_probabilities(pedigree, gene_probabilities, trait):
+    """
+    Return the probability of every person having the trait: 0 or 1
+    where it is known, and its expectation given the estimated genes
+    otherwise.
+    """
+    has_trait = gene_probabilities @ trait[:, 1]
+    has_trait[pedigree.known] = pedigree.traits[pedigree.known]
+    return has_trait
+
+
+def likelihood_weighting(people, tolerance=TOLERANCE, samples=10000, max_samples=10 ** 6,
+                         probs=None, seed=None):
+    """
+    Estimate every person's gene and trait distribution by likelihood
+    weighting: batches of `samples` gene assignments are drawn parents
+    first from PROBS, and each is weighted by the probability of the
+    known traits. Sampling stops once the standard error of every
+    estimated gene probability is below `tolerance`, or after
+    `max_samples` samples. With many known traits the weights collapse
+    onto a few samples, so large pedigrees call for Gibbs sampling.
+
+    Return the probabilities and a dictionary of diagnostics.
+    """
+    if probs is None:
+        probs = heredity.PROBS
+    gene, inheritance, trait = tables(probs)
+    pedigree = Pedigree(people)
+    n = len(pedigree)
+    rng = np.random.default_rng(seed)
+
+    # Weighted sums, rescaled to the largest log weight seen so far
+    scale = -np.inf
+    weights = 0.0
+    squares = 0.0
+    counts = np.zeros((n, 3))
+    square_counts = np.zeros((n, 3))
+
+    drawn = 0
+    error = np.inf
+    while drawn < max_samples:
+        genes = sample_prior(pedigree, gene, inheritance, samples, rng)
+
+        with np.errstate(divide="ignore"):
+            logs = np.log(trait[genes[:, pedigree.known], pedigree.traits[pedigree.known]]).sum(axis=1)
+        drawn += samples
+
+        top = logs.max()
+        if top == -np.inf:
+            continue
+        if top > scale:
+            shrink = np.exp(scale - top)
+            weights *= shrink
+            counts *= shrink
+            squares *= shrink ** 2
+            square_counts *= shrink ** 2
+            scale = top
+
+        w = np.exp(logs - scale)
+        weights += w.sum()
+        squares += (w ** 2).sum()
+        for value in range(3):
+            indicator = genes == value
+            counts[:, value] += w @ indicator
+            square_counts[:, value] += (w ** 2) @ indicator
+
+        # Delta-method variance of a ratio estimate of a probability. When a
+        # few heavy samples dominate it looks deceptively small, so it is
+        # never taken below the worst case for the effective sample size
+        estimate = counts / weights
+        variance = (square_counts * (1 - 2 * estimate) + estimate ** 2 * squares) / weights ** 2
+        variance = np.maximum(variance, 0.25 * squares / weights ** 2)
+        error = float(np.sqrt(variance).max()) if n > 0 else 0.0
+        if error < tolerance:
+            break
+
+    if weights == 0:
+        raise ValueError("every sample contradicts the known traits")
+
+    gene_probabilities = counts / weights
+    probabilities = pedigree.probabilities(gene_probabilities, trait_probabilities(pedigree, gene_probabilities, trait))
+    diagnostics = {
+        "samples": drawn,
+        "effective samples": float(weights ** 2 / squares),
+        "standard error": error,
+        "converged": error < tolerance
+    }
+    return probabilities, diagnostics
+
+
+def clique_tables(potentials):
+    """
+    Return every Factor in `potentials` as an array with one axis of
+    size 3 per variable, in the factor's variable order.
+    """
+    arrays = []
+    for factor in potentials:
+        array = np.zeros((3,) * len(factor.variables))
+        for genes, value in factor.table.items():
+            array[genes] = value
+        arrays.append(array)
+    return arrays
+
+
+def sample_posterior(pedigree, cliques, arrays, size, rng):
+    """
+    Return `size` gene assignments drawn from their distribution given
+    the known traits, by backward sampling the junction tree whose
+    `cliques` have the upward-pass potentials `arrays`: roots first,
+    each clique's person is drawn given the persons it shares with its
+    parent clique, which are already drawn.
+    """
+    column = {person: i for i, person in enumerate(pedigree.names)}
+    genes = np.empty((size, len(pedigree)), dtype=np.intp)
+
+    for i in reversed(range(len(cliques))):
+        person, separator = cliques[i][0], cliques[i][1:]
+        weights = arrays[i][(slice(None),) + tuple(genes[:, column[v]] for v in separator)]
+        cumulative = np.broadcast_to(weights.T if separator else weights, (size, 3)).cumsum(axis=1)
+        u = rng.random((size, 1)) * cumulative[:, -1:]
+        genes[:, column[person]] = np.minimum((u > cumulative).sum(axis=1), 2)
+    return genes
+
+
+def gibbs(people, tolerance=TOLERANCE, chains=256, burn_in=0, check=10, max_sweeps=20000,
+          probs=None, seed=None):
+    """
+    Estimate every person's gene and trait distribution by blocked Gibbs
+    sampling of `chains` chains at once, with the whole pedigree as one
+    block: a sweep redraws every person's genes jointly given the known
+    traits, by forward filtering, backward sampling on the junction tree
+    of elimination.py. Redrawing one person at a time mixes far too
+    slowly on large pedigrees, since a child's genes are all but fixed
+    by its parents', while one block makes every sweep an independent
+    exact draw, so no burn-in is needed and the cost of a sweep grows
+    linearly with a tree-like pedigree.
+
+    After `burn_in` sweeps, every `check` sweeps the chains are compared:
+    sampling stops once the Gelman-Rubin statistic of every estimated
+    gene probability is below 1.01 and its standard error, from the
+    spread of the chain averages, is below `tolerance`, or after
+    `max_sweeps` sweeps.
+
+    Return the probabilities and a dictionary of diagnostics.
+    """
+    from elimination import junction_tree
+
+    if probs is None:
+        probs = heredity.PROBS
+    trait = tables(probs)[2]
+    pedigree = Pedigree(people)
+    n = len(pedigree)
+    rng = np.random.default_rng(seed)
+
+    cliques, _, potentials, _ = junction_tree(people, probs)
+    arrays = clique_tables(potentials)
+
+    counts = np.zeros((chains, n, 3))
+    kept = 0
+    sweeps = 0
+    error = np.inf
+    rhat = np.inf
+    while sweeps < max_sweeps:
+        genes = sample_posterior(pedigree, cliques, arrays, chains, rng)
+        sweeps += 1
+
+        if sweeps <= burn_in:
+            continue
+        counts[np.arange(chains)[:, None], np.arange(n), genes] += 1
+        kept += 1
+
+        if kept % check != 0 or chains < 2:
+            continue
+
+        # Gelman-Rubin statistic, from within- and between-chain variances
+        means = counts / kept
+        within = (means * (1 - means)).mean(axis=0) * kept / max(kept - 1, 1)
+        between = means.var(axis=0, ddof=1)
+        pooled = within * (kept - 1) / kept + between
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratios = np.where(within > 0, pooled / within, 1.0)
+        rhat = float(np.sqrt(ratios).max()) if n > 0 else 1.0
+        error = float(np.sqrt(between / chains).max()) if n > 0 else 0.0
+        if rhat < 1.01 and error < tolerance:
+            break
+
+    gene_probabilities = counts.sum(axis=0) / max(kept * chains, 1)
+    probabilities = pedigree.probabilities(gene_probabilities, trait_probabilities(pedigree, gene_probabilities, trait))
+    diagnostics = {
+        "sweeps": sweeps,
+        "samples": kept * chains,
+        "gelman-rubin": rhat,
+        "standard error": error,
+        "converged": rhat < 1.01 and error < tolerance
+    }
+    return probabilities, diagnostics
+
+
+def tree_pedigree(size, seed=None):
+    """
+    Return a tree-shaped pedigree of `size` persons, in the format of
+    load_data: every child has one parent from the family and one who
+    married in, so there are no cousin marriages, and a little over half
+    of the persons have a known trait.
+    """
+    rng = np.random.default_rng(seed)
+    people = dict()
+
+    def add(mother=None, father=None):
+        name = f"person{len(people)}"
+        trait = None if rng.random() < 0.4 else bool(rng.random() < 0.3)
+        people[name] = {"name": name, "mother": mother, "father": father, "trait": trait}
+        return name
+
+    family = [add()]
+    while len(people) < size:
+        parent = family[rng.integers(len(family))]
+        spouse = add()
+        for _ in range(rng.integers(1, 4)):
+            if len(people) >= size:
+                break
+            if rng.random() < 0.5:
+                family.append(add(parent, spouse))
+            else:
+                family.append(add(spouse, parent))
+    return people
+
+
+def check(size, method="gibbs", tolerance=TOLERANCE, seed=0):
+    """
+    Run the sampling `method` on a tree-shaped pedigree of `size`
+    persons and return its diagnostics and the largest difference of an
+    estimated gene probability from the exact one of elimination.py.
+    """
+    from elimination import marginals
+
+    people = tree_pedigree(size, seed)
+    probabilities, diagnostics = METHODS[method](people, tolerance, seed=seed)
+    exact = marginals(people)
+    error = max(
+        abs(probabilities[person]["gene"][value] - exact[person]["gene"][value])
+        for person in people for value in (2, 1, 0)
+    )
+    return diagnostics, error
+
+
+# Approximate inference methods, by name
+METHODS = {
+    "likelihood": likelihood_weighting,
+    "gibbs": gibbs
+}
+
+
+if __name__ == "__main__":
+    main()
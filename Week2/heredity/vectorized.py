@@ -0,0 +1,123 @@
+import sys
+
+import numpy as np
+
+import heredity
+from heredity import load_data, print_probabilities
+
+# Assignments evaluated at a time when enumerating every assignment
+BLOCK_SIZE = 1 << 16
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python vectorized.py data.csv")
+    people = load_data(sys.argv[1])
+    probabilities = marginals(people)
+
+    print_probabilities(people, probabilities)
+
+
+def tables(probs):
+    """
+    Return PROBS as arrays: the unconditional gene distribution indexed
+    by genes, heredity's inheritance table indexed by (mother genes,
+    father genes, child genes) and its trait table indexed by (genes,
+    trait).
+    """
+    inheritance, trait = heredity.probability_tables(probs)
+    gene = np.array([probs["gene"][genes] for genes in range(3)])
+    return gene, np.array(inheritance), np.array(trait)
+
+
+def encode(people, assignments):
+    """
+    Return the (one_gene, two_genes, have_trait) set triples in
+    `assignments` as a gene count array and a trait array, with one row
+    per assignment and one column per person in `people` order.
+    """
+    names = list(people)
+    genes = np.zeros((len(assignments), len(names)), dtype=np.int8)
+    traits = np.zeros((len(assignments), len(names)), dtype=bool)
+
+    for row, (one_gene, two_genes, have_trait) in enumerate(assignments):
+        for column, person in enumerate(names):
+            genes[row, column] = 1 if person in one_gene else 2 if person in two_genes else 0
+            traits[row, column] = person in have_trait
+
+    return genes, traits
+
+
+def joint_probabilities(people, genes, traits, probs=None):
+    """
+    Return the joint probability of every row of `genes` and `traits`,
+    as returned by `encode`: the same value heredity.joint_probability
+    gives for that assignment, for a whole batch at once.
+    """
+    if probs is None:
+        probs = heredity.PROBS
+    gene, inheritance, trait = tables(probs)
+
+    names = list(people)
+    column = {person: i for i, person in enumerate(names)}
+    founders = [i for i, person in enumerate(names) if people[person]["mother"] is None]
+    children = [i for i, person in enumerate(names) if people[person]["mother"] is not None]
+    mothers = [column[people[names[i]]["mother"]] for i in children]
+    fathers = [column[people[names[i]]["father"]] for i in children]
+
+    genes = np.asarray(genes, dtype=np.intp)
+    traits = np.asarray(traits, dtype=np.intp)
+
+    probability = trait[genes, traits].prod(axis=1)
+    probability *= gene[genes[:, founders]].prod(axis=1)
+    probability *= inheritance[genes[:, mothers], genes[:, fathers], genes[:, children]].prod(axis=1)
+    return probability
+
+
+def marginals(people, probs=None, block_size=BLOCK_SIZE):
+    """
+    Return every person's gene and trait distribution given the known
+    traits, in the same format as heredity.main's `probabilities`, by
+    enumerating every gene assignment and every assignment of the
+    unknown traits, `block_size` of them at a time.
+    """
+    names = list(people)
+    n = len(names)
+    unknown = [i for i, person in enumerate(names) if people[person]["trait"] is None]
+    known = np.array([bool(people[person]["trait"]) for person in names])
+
+    # Assignment k has person i's genes as base-3 digit i of k, and the
+    # j-th unknown trait as bit j of k // 3 ** n
+    powers = 3 ** np.arange(n, dtype=np.int64)
+    bits = 1 << np.arange(len(unknown), dtype=np.int64)
+    total = 3 ** n * 2 ** len(unknown)
+
+    gene_sums = np.zeros((n, 3))
+    trait_sums = np.zeros(n)
+    for start in range(0, total, block_size):
+        k = np.arange(start, min(start + block_size, total), dtype=np.int64)
+        genes = (k[:, None] // powers) % 3
+        traits = np.tile(known, (len(k), 1))
+        traits[:, unknown] = ((k[:, None] // 3 ** n) & bits) != 0
+
+        p = joint_probabilities(people, genes, traits, probs)
+        for i in range(n):
+            gene_sums[i] += np.bincount(genes[:, i], weights=p, minlength=3)
+        trait_sums += p @ traits
+
+    evidence = gene_sums[0].sum() if n > 0 else 1.0
+    probabilities = dict()
+    for i, person in enumerate(names):
+        has_trait = trait_sums[i] / evidence
+        if people[person]["trait"] is not None:
+            has_trait = float(people[person]["trait"])
+        probabilities[person] = {
+            "gene": {value: gene_sums[i, value] / evidence for value in (2, 1, 0)},
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+
+    return probabilities
+
+
+if __name__ == "__main__":
+    main()
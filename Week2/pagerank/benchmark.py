@@ -0,0 +1,190 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import outofcore
+import pagerank
+from engine import Graph, power_iteration
+from sampler import sample_ranks
+from solvers import SOLVERS, solve
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time PageRank implementations on synthetic graphs."
+    )
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000],
+                        help="numbers of pages, e.g. 1000 10000000")
+    parser.add_argument("--kinds", nargs="+", choices=list(GENERATORS),
+                        default=list(GENERATORS))
+    parser.add_argument("--dangling", nargs="+", type=float, default=[0.0, 0.3],
+                        help="fractions of pages without links")
+    parser.add_argument("--degree", type=float, default=8,
+                        help="average number of links per linking page")
+    parser.add_argument("--python-limit", type=int, default=500,
+                        help="largest graph to run the pure Python functions on")
+    parser.add_argument("--gauss-seidel-limit", type=int, default=10000,
+                        help="largest graph to run the row-by-row Gauss-Seidel solver on")
+    parser.add_argument("--samples", type=int, default=1000000,
+                        help="samples for the vectorised sampler")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'graph':>12} {'pages':>9} {'links':>10} {'dangling':>8} {'method':>18} "
+          f"{'seconds':>9} {'peak MB':>8} {'iters':>6} {'L1 error':>9}")
+
+    for kind in args.kinds:
+        for size in args.sizes:
+            for dangling in args.dangling:
+                rng = np.random.default_rng(args.seed)
+                graph = GENERATORS[kind](size, args.degree, dangling, rng)
+                rows = benchmark(graph, args.python_limit, args.gauss_seidel_limit,
+                                 args.samples, args.seed)
+                for row in rows:
+                    print(f"{kind:>12} {size:>9} {len(graph.indices):>10} {dangling:>8.2f} "
+                          f"{row['method']:>18} {row['seconds']:>9.3f} {row['peak']:>8.1f} "
+                          f"{row['iterations'] if row['iterations'] is not None else '-':>6} "
+                          f"{row['error']:>9.2e}"
+                          + (f"  {row['failure']}" if "failure" in row else ""))
+
+
+def from_pairs(n, sources, targets):
+    """
+    Return the Graph of `n` pages with the links sources[k] -> targets[k],
+    dropping self-links and duplicates.
+    """
+    keep = sources != targets
+    pairs = np.unique(sources[keep] * n + targets[keep])
+    sources, targets = np.divmod(pairs, n)
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=n))])
+    return Graph([f"{page}.html" for page in range(n)], indptr, targets)
+
+
+def erdos_renyi(n, degree, dangling, rng):
+    """
+    Random graph where every linking page links to about `degree`
+    pages chosen uniformly, and a `dangling` fraction of pages has no
+    links.
+    """
+    degrees = rng.poisson(degree, n)
+    degrees[rng.random(n) < dangling] = 0
+    sources = np.repeat(np.arange(n), degrees)
+    targets = rng.integers(0, n, len(sources))
+    return from_pairs(n, sources, targets)
+
+
+def power_law(n, degree, dangling, rng, exponent=2.1):
+    """
+    Scale-free graph: out-degrees follow a power law with mean close
+    to `degree`, and targets are drawn with power-law popularity, so a
+    few pages collect most links. A `dangling` fraction of pages has
+    no links.
+    """
+    degrees = rng.zipf(exponent, n).astype(np.float64)
+    degrees = np.minimum(np.round(degrees * degree / degrees.mean()), n - 1).astype(np.int64)
+    degrees[rng.random(n) < dangling] = 0
+    sources = np.repeat(np.arange(n), degrees)
+
+    popularity = 1.0 / np.arange(1, n + 1) ** (1 / (exponent - 1))
+    cumulative = np.cumsum(popularity[rng.permutation(n)])
+    targets = np.searchsorted(cumulative, rng.random(len(sources)) * cumulative[-1])
+    return from_pairs(n, sources, np.minimum(targets, n - 1))
+
+
+# Synthetic graph generators, by name
+GENERATORS = {
+    "erdos-renyi": erdos_renyi,
+    "power-law": power_law
+}
+
+
+def measure(function):
+    """
+    Call `function` and return its result, the seconds it took and the
+    peak memory it allocated in MB.
+
+    Tracing allocations slows Python code several times over, so the
+    timed call runs untraced and the peak comes from a second, traced
+    call.
+    """
+    start = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def benchmark(graph, python_limit, gauss_seidel_limit, samples, seed):
+    """
+    Run every PageRank implementation on `graph` and return one row per
+    method with its time, peak memory, iterations and L1 error against
+    a tightly converged reference solution.
+    """
+    reference = power_iteration(graph, tolerance=1e-13).ranks
+    rows = []
+
+    def record(method, function, iterations=None):
+        try:
+            result, seconds, peak = measure(function)
+        except Exception as error:
+            rows.append({"method": f"{method} (failed)", "seconds": float("nan"),
+                         "peak": float("nan"), "iterations": None, "error": float("nan"),
+                         "failure": f"{type(error).__name__}: {error}"})
+            return
+
+        ranks, count = iterations(result) if iterations else (result, None)
+        rows.append({
+            "method": method,
+            "seconds": seconds,
+            "peak": peak,
+            "iterations": count,
+            "error": float("nan") if ranks is None else float(np.abs(np.asarray(ranks) - reference).sum())
+        })
+
+    if len(graph) <= python_limit:
+        corpus = {
+            name: {graph.names[j] for j in graph.indices[graph.indptr[i]:graph.indptr[i + 1]]}
+            for i, name in enumerate(graph.names)
+        }
+
+        def transition_models():
+            for page in corpus:
+                pagerank.transition_model(corpus, corpus[page], pagerank.DAMPING)
+            return None
+
+        def as_array(ranks):
+            return [ranks[name] for name in graph.names], None
+
+        record("transition_model", transition_models)
+        record("sample_pagerank", lambda: pagerank.sample_pagerank(corpus, pagerank.DAMPING, pagerank.SAMPLES), as_array)
+        record("iterate_pagerank", lambda: pagerank.iterate_pagerank(corpus, pagerank.DAMPING), as_array)
+
+    record("sample_ranks", lambda: sample_ranks(graph, pagerank.DAMPING, samples, seed=seed))
+    for name in SOLVERS:
+        if name == "gauss-seidel" and len(graph) > gauss_seidel_limit:
+            continue
+        record(name, lambda: solve(graph, pagerank.DAMPING, name), lambda result: (result.ranks, result.iterations))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "edges.bin")
+        sources = np.repeat(np.arange(len(graph)), graph.out_degrees())
+        outofcore.write_edges(path, [np.column_stack([sources, graph.indices])])
+        del sources
+        record("outofcore", lambda: outofcore.pagerank(path, len(graph)),
+               lambda result: (result.ranks, result.iterations))
+
+    return rows
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import multiprocessing
+import os
+import re
+import sys
+
+import numpy as np
+
+from engine import Graph, power_iteration
+from pagerank import DAMPING, LINK_PATTERN
+
+# Bytes read from a page at a time
+CHUNK_SIZE = 1 << 16
+
+# LINK_PATTERN compiled for raw bytes, so pages are scanned undecoded
+LINK_BYTES_PATTERN = re.compile(LINK_PATTERN.pattern.encode())
+
+# Page name -> id map shared with each worker process
+page_ids = dict()
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python crawler.py corpus [graph.npz]")
+    graph = crawl(sys.argv[1])
+    if len(sys.argv) == 3:
+        graph.save(sys.argv[2])
+    result = power_iteration(graph, DAMPING)
+    print(f"Crawled {len(graph)} pages and {len(graph.indices)} links")
+    for page, rank in sorted(graph.ranks_dict(result.ranks).items()):
+        print(f"  {page}: {rank:.4f}")
+
+
+def links_in(chunks):
+    """
+    Yield the target of every link in a page given as an iterable of
+    byte chunks. The unfinished tag at the end of a chunk, if any, is
+    carried over to the next one, so links split across chunks are
+    still found.
+    """
+    tail = b""
+    for chunk in chunks:
+        data = tail + chunk
+        cut = data.rfind(b"<")
+        if cut == -1 or data.find(b">", cut) != -1:
+            cut = len(data)
+        for match in LINK_BYTES_PATTERN.finditer(data, 0, cut):
+            yield match.group(1).decode("utf-8", "replace")
+        tail = data[cut:]
+
+    for match in LINK_BYTES_PATTERN.finditer(tail):
+        yield match.group(1).decode("utf-8", "replace")
+
+
+def init_worker(ids):
+    global page_ids
+    page_ids = ids
+
+
+def extract_links(path):
+    """
+    Stream the page at `path` in chunks and return the sorted ids of
+    the other corpus pages it links to.
+    """
+    with open(path, "rb") as f:
+        links = set(links_in(iter(lambda: f.read(CHUNK_SIZE), b"")))
+
+    own = page_ids[os.path.basename(path)]
+    ids = {page_ids[link] for link in links if link in page_ids}
+    ids.discard(own)
+    return np.array(sorted(ids), dtype=np.int64)
+
+
+def crawl(directory, processes=None, chunksize=64):
+    """
+    Parse a directory of HTML pages across a process pool and return
+    the link Graph between them. Page names are interned to ids up
+    front so workers return id arrays, which are appended to the
+    graph's CSR arrays in page order as they arrive.
+    """
+    names = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    )
+    ids = {name: i for i, name in enumerate(names)}
+    paths = [os.path.join(directory, name) for name in names]
+
+    indptr = np.zeros(len(names) + 1, dtype=np.int64)
+    indices = []
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(ids,)) as pool:
+        for i, links in enumerate(pool.imap(extract_links, paths, chunksize)):
+            indices.append(links)
+            indptr[i + 1] = indptr[i] + len(links)
+
+    indices = np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64)
+    return Graph(names, indptr, indices)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+import collections
+import sys
+
+import numpy as np
+from scipy import sparse
+
+from pagerank import DAMPING, crawl
+
+# Outcome of an iterative PageRank computation
+Result = collections.namedtuple("Result", ["ranks", "iterations", "residuals"])
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python engine.py corpus")
+    graph = Graph.from_corpus(crawl(sys.argv[1]))
+    result = power_iteration(graph, DAMPING)
+    print(f"PageRank Results from Power Iteration ({result.iterations} iterations)")
+    for page, rank in sorted(graph.ranks_dict(result.ranks).items()):
+        print(f"  {page}: {rank:.4f}")
+
+
+class Graph():
+    """
+    Compact link graph. Page names are interned to integer ids, and the
+    out-links of page i are indices[indptr[i]:indptr[i + 1]], optionally
+    with a weight per link in `weights`.
+    """
+
+    def __init__(self, names, indptr, indices, weights=None):
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.weights = None if weights is None else np.asarray(weights, dtype=np.float64)
+        self._matrix = None
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Build a graph from a corpus dictionary mapping each page to the
+        pages it links to (as returned by `crawl`). Links may also be
+        given as a dictionary mapping each linked page to a weight.
+        """
+        names = sorted(corpus)
+        ids = {name: i for i, name in enumerate(names)}
+        weighted = any(isinstance(links, dict) for links in corpus.values())
+
+        indptr = [0]
+        indices = []
+        weights = []
+        for name in names:
+            links = sorted(link for link in corpus[name] if link in ids)
+            indices.extend(ids[link] for link in links)
+            if weighted:
+                weights.extend(corpus[name][link] if isinstance(corpus[name], dict) else 1.0
+                               for link in links)
+            indptr.append(len(indices))
+
+        return cls(names, indptr, indices, weights if weighted else None)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a graph written by `save`.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            weights = data["weights"] if "weights" in data.files else None
+            return cls(data["names"].tolist(), data["indptr"], data["indices"], weights)
+
+    def save(self, path):
+        """
+        Save the graph's names and CSR arrays to a .npz file.
+        """
+        arrays = {"names": np.array(self.names, dtype=str),
+                  "indptr": self.indptr, "indices": self.indices}
+        if self.weights is not None:
+            arrays["weights"] = self.weights
+        np.savez(path, **arrays)
+
+    def __len__(self):
+        return len(self.names)
+
+    def out_degrees(self):
+        return np.diff(self.indptr)
+
+    def dangling(self):
+        """
+        Return a boolean array marking the pages without out-links.
+        """
+        return self.out_degrees() == 0
+
+    def transition_matrix(self):
+        """
+        Return the transposed link transition matrix as CSR, so that
+        `matrix @ ranks` moves each page's rank along its out-links.
+        Column j holds the probabilities of following each link of page
+        j (uniform, or proportional to link weight); columns of
+        dangling pages are empty. Built once and cached.
+        """
+        if self._matrix is None:
+            n = len(self)
+            degrees = self.out_degrees()
+            if self.weights is None:
+                data = np.repeat(1.0 / np.maximum(degrees, 1), degrees)
+            else:
+                sources = np.repeat(np.arange(n), degrees)
+                totals = np.bincount(sources, weights=self.weights, minlength=n)
+                data = self.weights / totals[sources]
+
+            forward = sparse.csr_matrix((data, self.indices, self.indptr), shape=(n, n))
+            self._matrix = forward.T.tocsr()
+
+        return self._matrix
+
+    def ranks_dict(self, ranks):
+        """
+        Return a dictionary mapping page names to their entry in `ranks`.
+        """
+        return {name: float(rank) for name, rank in zip(self.names, ranks)}
+
+
+def power_iteration(graph, damping_factor=DAMPING, tolerance=1e-10,
+                    max_iterations=1000, start=None, relative=0.0):
+    """
+    Return the PageRank of every page of `graph` by power iteration.
+
+    Each iteration follows the links of every page at once with a sparse
+    matrix product, spreads the rank of dangling pages evenly over all
+    pages, and stops once the L1 change between iterations is below
+    `tolerance`, or below `relative` times the first change. `start`
+    optionally gives an initial rank vector.
+    """
+    n = len(graph)
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling()
+
+    if start is None:
+        ranks = np.full(n, 1.0 / n)
+    else:
+        ranks = np.asarray(start, dtype=np.float64)
+        ranks = ranks / ranks.sum()
+
+    residuals = []
+    for iteration in range(1, max_iterations + 1):
+        new = damping_factor * (matrix @ ranks)
+        new += (damping_factor * ranks[dangling].sum() + 1 - damping_factor) / n
+
+        residuals.append(float(np.abs(new - ranks).sum()))
+        ranks = new
+        if residuals[-1] < max(tolerance, relative * residuals[0]):
+            break
+
+    return Result(ranks, iteration, residuals)
+
+
+def teleport_matrix(graph, seeds):
+    """
+    Return a sparse N x len(seeds) matrix whose columns are teleport
+    distributions. Each seed set is either a collection of page names,
+    teleported to uniformly, or a dictionary mapping page names to
+    weights.
+    """
+    rows = []
+    columns = []
+    values = []
+    for column, seed in enumerate(seeds):
+        weights = {graph.ids[page]: (seed[page] if isinstance(seed, dict) else 1.0) for page in seed}
+        total = sum(weights.values())
+        if total <= 0:
+            raise ValueError(f"seed set {column} has no weight")
+        for row, weight in weights.items():
+            rows.append(row)
+            columns.append(column)
+            values.append(weight / total)
+
+    return sparse.csc_matrix((values, (rows, columns)), shape=(len(graph), len(seeds)))
+
+
+def personalized_ranks(graph, teleport, damping_factor=DAMPING, tolerance=1e-10,
+                       max_iterations=1000):
+    """
+    Return an N x B matrix with the personalized PageRank of every page
+    for each of the B teleport distributions in the columns of the
+    sparse matrix `teleport`. All columns are iterated together, so each
+    pass over the transition matrix is one sparse matrix-matrix product;
+    the rank of dangling pages returns to each column's own teleport
+    vector.
+    """
+    matrix = graph.transition_matrix()
+    dangling = graph.dangling()
+    teleport = teleport.tocoo()
+
+    ranks = teleport.toarray()
+    for _ in range(max_iterations):
+        new = matrix @ ranks
+        new *= damping_factor
+
+        # Teleport vectors are sparse, so only their entries are updated
+        share = damping_factor * ranks[dangling].sum(axis=0) + 1 - damping_factor
+        new[teleport.row, teleport.col] += teleport.data * share[teleport.col]
+
+        ranks -= new
+        residual = np.abs(ranks, out=ranks).sum(axis=0).max()
+        ranks = new
+        if residual < tolerance:
+            break
+
+    return ranks
+
+
+def personalized_pagerank(graph, seeds, damping_factor=DAMPING, k=10, block=32,
+                          tolerance=1e-10):
+    """
+    Return, for each seed set in `seeds` (see `teleport_matrix`), a list
+    of the `k` pages with the highest personalized PageRank as
+    (page, rank) pairs. Seed sets are processed `block` at a time, which
+    bounds memory to two N x `block` rank matrices.
+    """
+    results = []
+    for start in range(0, len(seeds), block):
+        teleport = teleport_matrix(graph, seeds[start:start + block])
+        ranks = personalized_ranks(graph, teleport, damping_factor, tolerance)
+
+        top = min(k, len(graph))
+        for column in range(ranks.shape[1]):
+            best = np.argpartition(-ranks[:, column], top - 1)[:top]
+            best = best[np.argsort(-ranks[best, column], kind="stable")]
+            results.append([(graph.names[i], float(ranks[i, column])) for i in best])
+
+    return results
+
+
+def pagerank(corpus, damping_factor=DAMPING, tolerance=1e-10):
+    """
+    Return PageRank values for each page of a corpus dictionary,
+    computed with `power_iteration`.
+    """
+    graph = Graph.from_corpus(corpus)
+    return graph.ranks_dict(power_iteration(graph, damping_factor, tolerance).ranks)
+
+
+if __name__ == "__main__":
+    main()
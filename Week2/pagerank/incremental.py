@@ -0,0 +1,255 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from engine import Graph, power_iteration
+from pagerank import DAMPING, LINK_PATTERN
+
+# File, inside the corpus directory, where the last run is remembered. The
+# link graph and ranks are kept beside it in a .npz file
+STATE = ".pagerank.json"
+
+# Updates appended to the state file before it is written out afresh
+JOURNAL_LIMIT = 100
+
+# A warm-started run stops once the change between iterations has shrunk
+# by this factor from the change the edits caused
+RELATIVE = 1e-4
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python incremental.py corpus [state]")
+    state = sys.argv[2] if len(sys.argv) == 3 else None
+    ranks, changes = update_pagerank(sys.argv[1], DAMPING, state)
+    print(f"{len(changes['added'])} added, {len(changes['removed'])} removed, "
+          f"{len(changes['changed'])} changed, {changes['iterations']} iterations")
+    print(f"PageRank Results from Incremental Iteration")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+
+def load_state(path):
+    """
+    Return the state saved by the last run, or an empty state, and the
+    number of updates appended to it since it was last written afresh.
+
+    The file holds one JSON line with the whole state, then one line per
+    later run with the damping factor and the entries of the pages that
+    run saw change, None for removed pages. A last line cut short by an
+    interrupted run is ignored; the next rescan finds its changes again.
+    """
+    try:
+        with open(path) as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return {"damping": None, "pages": dict()}, 0
+
+    state = json.loads(lines[0])
+    state.pop("ranks", None)
+    for line in lines[1:]:
+        try:
+            update = json.loads(line)
+        except json.JSONDecodeError:
+            break
+        state["damping"] = update["damping"]
+        for name, page in update["pages"].items():
+            if page is None:
+                state["pages"].pop(name, None)
+            else:
+                state["pages"][name] = page
+    return state, len(lines) - 1
+
+
+def save_state(path, state):
+    """
+    Save `state` to `path`, replacing the old file only once written.
+    """
+    with open(path + ".tmp", "w") as f:
+        f.write(json.dumps(state) + "\n")
+    os.replace(path + ".tmp", path)
+
+
+def append_state(path, state, names):
+    """
+    Append the damping factor of `state` and its entries for the pages
+    `names` to the state file at `path`, so a run that changed a few
+    pages writes just those.
+    """
+    update = {"damping": state["damping"], "pages": {name: state["pages"].get(name) for name in names}}
+    with open(path, "a") as f:
+        f.write(json.dumps(update) + "\n")
+
+
+def load_ranks(path):
+    """
+    Return the graph and ranks saved by `save_ranks`, or None.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            return Graph(data["names"].tolist(), data["indptr"], data["indices"]), data["ranks"]
+    except FileNotFoundError:
+        return None
+
+
+def save_ranks(path, graph, ranks):
+    """
+    Save the CSR arrays of `graph` and its ranks to the .npz file `path`,
+    replacing the old file only once written.
+    """
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, names=np.array(graph.names, dtype=str), indptr=graph.indptr,
+                 indices=graph.indices, ranks=ranks)
+    os.replace(path + ".tmp", path)
+
+
+def rescan(directory, pages):
+    """
+    Bring `pages`, a dictionary mapping each HTML file of `directory` to
+    its modification time, size, content hash and links, up to date.
+    Only files whose time or size changed are read, and only files whose
+    content changed are parsed again.
+    Return the sets of added, removed and changed files, and of files
+    whose time or size changed but not their content.
+    """
+    added = set()
+    changed = set()
+    touched = set()
+    seen = set()
+
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".html"):
+            continue
+        seen.add(entry.name)
+        stat = entry.stat()
+
+        old = pages.get(entry.name)
+        if old is not None and old["mtime"] == stat.st_mtime and old["size"] == stat.st_size:
+            continue
+
+        with open(entry.path, "rb") as f:
+            contents = f.read()
+        digest = hashlib.sha1(contents).hexdigest()
+
+        if old is not None and old["hash"] == digest:
+            old["mtime"] = stat.st_mtime
+            old["size"] = stat.st_size
+            touched.add(entry.name)
+            continue
+
+        links = set(LINK_PATTERN.findall(contents.decode())) - {entry.name}
+        pages[entry.name] = {
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+            "hash": digest,
+            "links": sorted(links)
+        }
+        if old is None:
+            added.add(entry.name)
+        else:
+            changed.add(entry.name)
+
+    removed = set(pages) - seen
+    for name in removed:
+        del pages[name]
+
+    return added, removed, changed, touched
+
+
+def relink(graph, rows):
+    """
+    Return `graph` with the out-links of each page id in `rows` replaced
+    by the array of page ids it maps to. The CSR arrays are spliced
+    around the replaced rows, so the other pages' links are never
+    rebuilt.
+    """
+    indptr, indices = graph.indptr, graph.indices
+    degrees = graph.out_degrees()
+
+    pieces = []
+    previous = 0
+    for page in sorted(rows):
+        pieces.extend([indices[indptr[previous]:indptr[page]], rows[page]])
+        degrees[page] = len(rows[page])
+        previous = page + 1
+    pieces.append(indices[indptr[previous]:])
+
+    return Graph(graph.names, np.concatenate([[0], np.cumsum(degrees)]), np.concatenate(pieces))
+
+
+def update_pagerank(directory, damping_factor=DAMPING, state_path=None, tolerance=1e-10,
+                    relative=RELATIVE):
+    """
+    Return PageRank values for the HTML pages of `directory`, reusing
+    the links and ranks saved by the previous run.
+
+    Files are re-read only when their modification time or size changed
+    and re-parsed only when their content hash changed, and only those
+    pages' entries are appended to the state file. When pages were
+    only edited, just their rows of the saved link graph are replaced;
+    the graph is rebuilt only when pages come or go. Power iteration then
+    starts from the previous ranks, which after a few edits are already
+    close to the answer, and stops once the change between iterations is
+    below `relative` times the change in the first iteration, or below
+    `tolerance`. The ranks are then within about `relative` of how far
+    the edits moved them, so a small edit costs a small fraction of a
+    full run instead of converging again all the way to `tolerance`.
+
+    Return the ranks and a dictionary with the added, removed and
+    changed pages and the number of iterations.
+    """
+    if state_path is None:
+        state_path = os.path.join(directory, STATE)
+    ranks_path = os.path.splitext(state_path)[0] + ".npz"
+    state, journal = load_state(state_path)
+    saved = load_ranks(ranks_path)
+
+    added, removed, changed, touched = rescan(directory, state["pages"])
+    changes = {"added": added, "removed": removed, "changed": changed, "iterations": 0}
+    damping = state["damping"]
+    state["damping"] = damping_factor
+    corpus = {name: page["links"] for name, page in state["pages"].items()}
+
+    graph, ranks = saved if saved is not None else (None, None)
+    if graph is None or len(graph) == 0 or damping != damping_factor:
+        graph = Graph.from_corpus(corpus)
+        start = None
+    elif added or removed or graph.names != sorted(corpus):
+        # Page ids shift, so rebuild the graph; new pages get the average rank
+        previous = graph.ranks_dict(ranks)
+        graph = Graph.from_corpus(corpus)
+        start = [previous.get(name, 1 / len(graph)) for name in graph.names]
+    elif changed:
+        rows = dict()
+        for name in changed:
+            links = sorted(graph.ids[link] for link in corpus[name] if link in graph.ids)
+            rows[graph.ids[name]] = np.array(links, dtype=np.int64)
+        graph = relink(graph, rows)
+        start = ranks
+
+    if saved is None or graph is not saved[0]:
+        if len(graph) == 0:
+            ranks = np.zeros(0)
+        else:
+            result = power_iteration(graph, damping_factor, tolerance, start=start,
+                                     relative=relative if start is not None else 0.0)
+            ranks = result.ranks
+            changes["iterations"] = result.iterations
+
+        # Ranks first: if the state then fails to save, the next run finds
+        # the same edits again, and replacing the same rows changes nothing
+        save_ranks(ranks_path, graph, ranks)
+    updated = added | removed | changed | touched
+    if journal < JOURNAL_LIMIT and os.path.exists(state_path) and (updated or damping != damping_factor):
+        append_state(state_path, state, updated)
+    elif updated or damping != damping_factor:
+        save_state(state_path, state)
+
+    return graph.ranks_dict(ranks), changes
+
+
+if __name__ == "__main__":
+    main()
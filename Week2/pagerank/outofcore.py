@@ -0,0 +1,209 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from engine import Result
+from pagerank import DAMPING
+
+# Binary layout of one link: source page id, then target page id
+EDGE = np.dtype([("source", "<i8"), ("target", "<i8")])
+
+# Links sorted in memory at a time when building an edge file
+RUN_SIZE = 1 << 22
+
+# Links streamed from the edge file at a time during an iteration
+BLOCK_SIZE = 1 << 22
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit("Usage: python outofcore.py edges.bin pages")
+    result = pagerank(sys.argv[1], int(sys.argv[2]), DAMPING)
+    print(f"PageRank Results from Out-of-Core Iteration ({result.iterations} iterations)")
+    for page in np.argsort(-result.ranks)[:10]:
+        print(f"  {page}: {result.ranks[page]:.6f}")
+
+
+def write_edges(path, edges, run_size=RUN_SIZE):
+    """
+    Write the links given by `edges`, an iterable of (source, target)
+    arrays or pairs, to a binary edge file at `path` sorted by source,
+    dropping self-links and duplicate links as `crawl` does.
+
+    Links are buffered `run_size` at a time, and each run is packed into
+    one 64-bit key per link (source in the high half, target in the low
+    half), sorted, deduplicated and spilled to a
+    temporary file. The runs are then merged, so graphs bigger than
+    memory can be written. Page ids must fit in 32 bits.
+    """
+    runs = []
+    buffer = []
+    buffered = 0
+
+    def spill():
+        nonlocal buffer, buffered
+        run = tempfile.NamedTemporaryFile(delete=False, dir=os.path.dirname(os.path.abspath(path)))
+        distinct(np.concatenate(buffer)).tofile(run)
+        run.close()
+        runs.append(run.name)
+        buffer = []
+        buffered = 0
+
+    for chunk in edges:
+        chunk = np.asarray(chunk)
+        if chunk.dtype == EDGE:
+            sources, targets = chunk["source"], chunk["target"]
+        else:
+            sources, targets = chunk[:, 0], chunk[:, 1]
+        if len(chunk) > 0 and (min(sources.min(), targets.min()) < 0 or max(sources.max(), targets.max()) >= 1 << 32):
+            raise ValueError("page ids must be between 0 and 2 ** 32 - 1")
+
+        keep = sources != targets
+        buffer.append(pack(sources[keep], targets[keep]))
+        buffered += len(buffer[-1])
+        if buffered >= run_size:
+            spill()
+    if buffered > 0:
+        spill()
+
+    try:
+        with open(path, "wb") as f:
+            merge(runs, f)
+    finally:
+        for run in runs:
+            os.remove(run)
+
+
+def pack(sources, targets):
+    """
+    Return one 64-bit key per link, ordering links by source and then
+    target.
+    """
+    return (np.asarray(sources).astype(np.uint64) << np.uint64(32)) | np.asarray(targets).astype(np.uint64)
+
+
+def distinct(keys):
+    """
+    Return `keys` sorted, without repeats. Sorting in place and keeping
+    each key that differs from the one before is much faster than
+    np.unique on large arrays.
+    """
+    keys.sort()
+    keep = np.empty(len(keys), dtype=bool)
+    keep[:1] = True
+    np.not_equal(keys[1:], keys[:-1], out=keep[1:])
+    return keys[keep]
+
+
+def unpack(keys):
+    """
+    Return the links packed into `keys` as EDGE records.
+    """
+    block = np.empty(len(keys), dtype=EDGE)
+    block["source"] = keys >> np.uint64(32)
+    block["target"] = keys & np.uint64(0xFFFFFFFF)
+    return block
+
+
+def merge(runs, f):
+    """
+    Merge the sorted key run files `runs` into the open file `f` as EDGE
+    records, a block of every run at a time. Every key up to the
+    smallest last key of the blocks in memory is already in memory, so
+    each round sorts those keys together, drops keys found in several
+    runs, writes them and refills the blocks it used up.
+    """
+    keys = [np.memmap(run, dtype=np.uint64, mode="r") if os.path.getsize(run) > 0
+            else np.zeros(0, dtype=np.uint64) for run in runs]
+    size = max(BLOCK_SIZE // max(len(runs), 1), 1)
+    positions = [0] * len(runs)
+    blocks = [np.zeros(0, dtype=np.uint64) for _ in runs]
+    last = None
+
+    while True:
+        for i, run in enumerate(keys):
+            if len(blocks[i]) == 0 and positions[i] < len(run):
+                blocks[i] = np.array(run[positions[i]:positions[i] + size])
+                positions[i] += len(blocks[i])
+
+        active = [i for i in range(len(runs)) if len(blocks[i]) > 0]
+        if not active:
+            break
+        bound = min(blocks[i][-1] for i in active)
+
+        parts = []
+        for i in active:
+            cut = np.searchsorted(blocks[i], bound, side="right")
+            parts.append(blocks[i][:cut])
+            blocks[i] = blocks[i][cut:]
+
+        merged = distinct(np.concatenate(parts))
+        if last is not None and len(merged) > 0 and merged[0] == last:
+            merged = merged[1:]
+        if len(merged) > 0:
+            unpack(merged).tofile(f)
+            last = merged[-1]
+
+
+def open_edges(path):
+    """
+    Memory-map the edge file at `path` read-only.
+    """
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=EDGE)
+    return np.memmap(path, dtype=EDGE, mode="r")
+
+
+def out_degrees(edges, n):
+    """
+    Count the out-links of every page in one streaming pass.
+    """
+    degrees = np.zeros(n, dtype=np.int64)
+    for start in range(0, len(edges), BLOCK_SIZE):
+        block = edges[start:start + BLOCK_SIZE]
+        np.add.at(degrees, block["source"], 1)
+    return degrees
+
+
+def pagerank(path, n, damping_factor=DAMPING, tolerance=1e-10, max_iterations=1000):
+    """
+    Return the PageRank Result of the `n`-page graph stored in the
+    source-sorted edge file at `path`.
+
+    Only the current and next rank vectors (and the inverse out-degrees)
+    are kept in memory: every iteration streams the memory-mapped edge
+    file once, block by block, adding each link's share of its source's
+    rank to its target.
+    """
+    edges = open_edges(path)
+    degrees = out_degrees(edges, n)
+    dangling = np.flatnonzero(degrees == 0)
+
+    # Pre-divide by the out-degree, so each link just carries its source's share
+    inverse = np.divide(1.0, degrees, out=np.zeros(n), where=degrees > 0)
+    del degrees
+
+    ranks = np.full(n, 1.0 / n)
+    residuals = []
+    for iteration in range(1, max_iterations + 1):
+        new = np.zeros(n)
+        for start in range(0, len(edges), BLOCK_SIZE):
+            block = edges[start:start + BLOCK_SIZE]
+            sources = block["source"]
+            np.add.at(new, block["target"], ranks[sources] * inverse[sources])
+
+        new *= damping_factor
+        new += (damping_factor * ranks[dangling].sum() + 1 - damping_factor) / n
+
+        residuals.append(float(np.abs(new - ranks).sum()))
+        ranks = new
+        if residuals[-1] < tolerance:
+            break
+
+    return Result(ranks, iteration, residuals)
+
+
+if __name__ == "__main__":
+    main()
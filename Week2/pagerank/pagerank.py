@@ -6,6 +6,9 @@ import sys
 DAMPING = 0.85
 SAMPLES = 10000
 
+# Matches the target of every link in an HTML page
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
 
 def main():
     if len(sys.argv) != 2:
@@ -35,7 +38,7 @@ def crawl(directory):
             continue
         with open(os.path.join(directory, filename)) as f:
             contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
+            links = LINK_PATTERN.findall(contents)
             pages[filename] = set(links) - {filename}
 
     # Only include links to other pages in the corpus
@@ -80,6 +83,35 @@ def transition_model(corpus, page, damping_factor):
     return probability
 
 
+def alias_table(weights):
+    """
+    Return Walker alias tables (probability, alias) for picking an index
+    with probability proportional to `weights` in constant time: choose
+    a slot i uniformly, keep it with probability[i], else take alias[i].
+    """
+    size = len(weights)
+    total = sum(weights)
+    scaled = [weight * size / total for weight in weights]
+
+    probability = [1.0] * size
+    alias = list(range(size))
+
+    small = [i for i in range(size) if scaled[i] < 1]
+    large = [i for i in range(size) if scaled[i] >= 1]
+    while small and large:
+        less = small.pop()
+        more = large.pop()
+        probability[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1 - scaled[less]
+        if scaled[more] < 1:
+            small.append(more)
+        else:
+            large.append(more)
+
+    return probability, alias
+
+
 def sample_pagerank(corpus, damping_factor, n):
     """
     Return PageRank values for each page by sampling `n` pages
@@ -92,36 +124,58 @@ def sample_pagerank(corpus, damping_factor, n):
 
     # Create dictionary to store probabilities
     probability = dict()
-        
-    # Create dictionary to store Transition Model probabilities
-    tmp = dict()
-    
-    # Fill the probability and tmp dictionaries
+
+    # Compact transition model: each page's links with their share of the
+    # damping factor, and alias tables to follow a link in constant time.
+    # Links may be a set, or a dictionary mapping each link to a weight
+    links = dict()
+    shares = dict()
+    tables = dict()
+
     for site in corpus:
-        probability[site] = 1.0 / len(corpus)
-        tmp[site] = transition_model(corpus, corpus[site], damping_factor)
+        probability[site] = 0.0
+        links[site] = list(corpus[site])
+
+        if isinstance(corpus[site], dict):
+            weights = [corpus[site][link] for link in links[site]]
+        else:
+            weights = [1.0] * len(links[site])
+
+        if len(weights) > 0:
+            shares[site] = [damping_factor * weight / sum(weights) for weight in weights]
+            tables[site] = alias_table(weights)
+
+    pages = list(corpus)
+
+    # Probability spread evenly over all pages, summed over the samples
+    uniform = 0.0
 
     # Choose randomly the first page that the surfer will visited
-    page = random.choice(list(probability.keys()))
+    page = random.choice(pages)
 
-    remainingSamples = n
+    for _ in range(n):
+        # Add the transition model of the actual page to the totals
+        if len(links[page]) == 0:
+            uniform += 1 / len(corpus)
+            page = random.choice(pages)
+            continue
 
-    while remainingSamples > 0:
-        # Distribute the tmp probabilities on the actual page for each page 
-        for site in probability:
-            probability[site] += tmp[page][site]
+        uniform += (1 - damping_factor) / len(corpus)
+        for link, share in zip(links[page], shares[page]):
+            probability[link] += share
 
         # Choose a new page to visit based on the damping factor
-        if random.random() <= damping_factor and len(page) > 0:
-            page = random.choice(list(corpus[page]))
+        if random.random() <= damping_factor:
+            slot = random.randrange(len(links[page]))
+            if random.random() >= tables[page][0][slot]:
+                slot = tables[page][1][slot]
+            page = links[page][slot]
         else:
-            page = random.choice(list(corpus.keys()))
-        
-        remainingSamples -= 1
+            page = random.choice(pages)
 
     # After take all samples, divide the probabilities by the number samples to normalize them
     for site in probability:
-        probability[site] /= n
+        probability[site] = (probability[site] + uniform) / n
 
     return probability
 
@@ -139,11 +193,15 @@ def iterate_pagerank(corpus, damping_factor):
     # Create dictionary to store probabilities
     probability = dict()
 
+    # Links of each page, without changing the caller's corpus
+    links = dict()
+
     # Fill the probability dictionary
     for site in corpus:
-        if len(corpus[site]) == 0:  # If the page has no links, add a link to all the pages in corpus
-            for page in corpus:
-                corpus[site].add(page)
+        if len(corpus[site]) == 0:  # If the page has no links, treat it as linking to all the pages in corpus
+            links[site] = set(corpus)
+        else:
+            links[site] = corpus[site]
 
         probability[site] = 1.0 / len(corpus)
 
@@ -159,14 +217,14 @@ def iterate_pagerank(corpus, damping_factor):
         for p in corpus:
             totalSum = 0.0
             # Iterate trough all the pages in corpus and their links 
-            for i in corpus:
-                for j in corpus[i]:
+            for i in links:
+                for j in links[i]:
                     """
                     If there is a link to the current page (p) update the total sum of probability
                     divided by the number of links of all pages that links to current page
                     """
                     if j == p:
-                        totalSum += probability[i] / len(corpus[i])
+                        totalSum += probability[i] / len(links[i])
 
             probability[p] = ((1 - damping_factor) / len(corpus)) + (damping_factor * totalSum)  # PageRank formula
 
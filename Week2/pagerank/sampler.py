@@ -0,0 +1,173 @@
+import math
+import multiprocessing
+import sys
+
+import numpy as np
+
+from engine import Graph, power_iteration
+from pagerank import DAMPING, SAMPLES, alias_table, crawl
+
+# Surfers walk until their start is forgotten up to this L1 distance
+# before their visits are counted
+BURN_IN_TOLERANCE = 1e-3
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python sampler.py corpus [samples] [seeds]")
+    samples = int(sys.argv[2]) if len(sys.argv) > 2 else SAMPLES
+    corpus = crawl(sys.argv[1])
+    ranks = sample_pagerank(corpus, DAMPING, samples)
+    print(f"PageRank Results from Vectorised Sampling (n = {samples})")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f}")
+
+    if len(sys.argv) == 4:
+        seeds = int(sys.argv[3])
+        error = bias(Graph.from_corpus(corpus), DAMPING, samples, seeds)
+        print(f"L1 error of the mean over {seeds} seeds against power iteration: {error:.4f}")
+
+
+class Links():
+    """
+    Compact transition model for sampling a random surfer's next page:
+    the graph's per-page out-link arrays, plus for weighted graphs a
+    Walker alias table per page laid out alongside the links, so any
+    page's next link is picked in constant time. Memory grows with the
+    number of links, not pages squared.
+    """
+
+    def __init__(self, graph):
+        self.size = len(graph)
+        self.indptr = graph.indptr
+        self.indices = graph.indices
+        self.degrees = graph.out_degrees()
+        self.dangling = self.degrees == 0
+        self.probability = None
+        self.alias = None
+
+        if graph.weights is not None:
+            self.probability = np.ones(len(self.indices))
+            self.alias = np.arange(len(self.indices))
+            for page in np.flatnonzero(self.degrees > 1):
+                start, end = self.indptr[page], self.indptr[page + 1]
+                probability, alias = alias_table(graph.weights[start:end].tolist())
+                self.probability[start:end] = probability
+                self.alias[start:end] = start + np.array(alias)
+
+    def follow(self, pages, rng):
+        """
+        Return a random out-link of each page in `pages`, which must
+        all have at least one link.
+        """
+        slots = (rng.random(len(pages)) * self.degrees[pages]).astype(np.int64)
+        positions = self.indptr[pages] + slots
+
+        if self.probability is not None:
+            aliased = rng.random(len(pages)) >= self.probability[positions]
+            positions[aliased] = self.alias[positions[aliased]]
+
+        return self.indices[positions]
+
+
+def burn_in(damping_factor, tolerance=BURN_IN_TOLERANCE):
+    """
+    Return the number of steps after which a surfer's page no longer
+    depends on where it started, up to L1 distance `tolerance`: every
+    step forgets all but a `damping_factor` share of the start.
+    """
+    if damping_factor <= 0:
+        return 1
+    return max(1, math.ceil(math.log(tolerance) / math.log(damping_factor)))
+
+
+def walk(links, damping_factor, n, walkers, seed):
+    """
+    Move `walkers` independent random surfers in lockstep, starting on
+    random pages, and return the number of visits of each page once `n`
+    pages have been visited in total. Each surfer first walks for the
+    burn-in without counting, so the uniform starts don't bias the
+    estimate.
+    """
+    rng = np.random.default_rng(seed)
+    visits = np.zeros(links.size, dtype=np.int64)
+    pages = rng.integers(0, links.size, walkers)
+
+    def step(pages):
+        # Surfers on a dangling page, or who don't follow a link, jump anywhere
+        jump = (rng.random(walkers) >= damping_factor) | links.dangling[pages]
+        following = ~jump
+        pages[following] = links.follow(pages[following], rng)
+        pages[jump] = rng.integers(0, links.size, int(jump.sum()))
+
+    for _ in range(burn_in(damping_factor)):
+        step(pages)
+
+    remaining = n
+    while remaining > 0:
+        step(pages)
+        visits += np.bincount(pages[:remaining], minlength=links.size)
+        remaining -= walkers
+
+    return visits
+
+
+def walk_shard(job):
+    return walk(*job)
+
+
+def sample_ranks(graph, damping_factor=DAMPING, n=SAMPLES, walkers=4096,
+                 processes=1, seed=None):
+    """
+    Estimate the PageRank of every page of `graph` from `n` page visits
+    of random surfers, simulated `walkers` at a time with NumPy.
+    Fewer surfers are used if needed, so each one counts at least as
+    many visits as its burn-in takes steps.
+    With `processes` > 1 the samples are split across a process pool,
+    each shard with an independent random stream.
+    """
+    links = Links(graph)
+
+    # Keep each surfer walking well past its burn-in
+    walkers = max(1, min(walkers, n // burn_in(damping_factor)))
+
+    if processes <= 1:
+        visits = walk(links, damping_factor, n, walkers, seed)
+    else:
+        seeds = np.random.SeedSequence(seed).spawn(processes)
+        shares = [n // processes + (1 if k < n % processes else 0) for k in range(processes)]
+        jobs = [
+            (links, damping_factor, share, max(1, min(walkers, share // burn_in(damping_factor))), shard)
+            for share, shard in zip(shares, seeds) if share > 0
+        ]
+        with multiprocessing.Pool(processes) as pool:
+            visits = sum(pool.map(walk_shard, jobs))
+
+    return visits / n
+
+
+def bias(graph, damping_factor=DAMPING, n=SAMPLES, seeds=50, processes=1):
+    """
+    Return the L1 distance between the mean of `sample_ranks` over
+    `seeds` seeds and the ranks from power iteration. Random errors
+    average out over seeds, so this stays large only if the sampler is
+    biased.
+    """
+    mean = np.mean([
+        sample_ranks(graph, damping_factor, n, processes=processes, seed=seed)
+        for seed in range(seeds)
+    ], axis=0)
+    return float(np.abs(mean - power_iteration(graph, damping_factor).ranks).sum())
+
+
+def sample_pagerank(corpus, damping_factor, n, walkers=4096, processes=1, seed=None):
+    """
+    Return PageRank values for each page of a corpus dictionary,
+    estimated with `sample_ranks`.
+    """
+    graph = Graph.from_corpus(corpus)
+    return graph.ranks_dict(sample_ranks(graph, damping_factor, n, walkers, processes, seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import collections
 import sys
 
 from crossword import *
@@ -15,6 +16,57 @@ class CrosswordCreator():
             for var in self.crossword.variables
         }
 
+        # Overlapping variables of each variable, the only ones constraining it
+        self.neighbors = {
+            var: self.crossword.neighbors(var)
+            for var in self.crossword.variables
+        }
+
+        # Per-variable index of the domain, built on first use
+        self.index = dict()
+
+        # Every (variable, word) removed from a domain, in order, so that
+        # backtracking can put back just what a failed value pruned
+        self.trail = []
+
+    def word_index(self, var):
+        """
+        Return the index of the domain of `var`, mapping each (position,
+        letter) pair to the set of words of the domain with that letter
+        at that position; its size is the number of words supporting
+        that letter there. Kept in sync by `remove_word` and `undo`.
+        """
+        if var not in self.index:
+            index = dict()
+            for word in self.domains[var]:
+                for position, letter in enumerate(word):
+                    index.setdefault((position, letter), set()).add(word)
+            self.index[var] = index
+        return self.index[var]
+
+    def remove_word(self, var, word):
+        """
+        Remove `word` from the domain of `var` and from its index, and
+        record it on the trail.
+        """
+        self.domains[var].remove(word)
+        if var in self.index:
+            for position, letter in enumerate(word):
+                self.index[var][position, letter].discard(word)
+        self.trail.append((var, word))
+
+    def undo(self, mark):
+        """
+        Put back every word removed since the trail had length `mark`,
+        into its domain and its index, latest first.
+        """
+        while len(self.trail) > mark:
+            var, word = self.trail.pop()
+            self.domains[var].add(word)
+            if var in self.index:
+                for position, letter in enumerate(word):
+                    self.index[var].setdefault((position, letter), set()).add(word)
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -91,6 +143,7 @@ class CrosswordCreator():
         """
         self.enforce_node_consistency()
         self.ac3()
+        self.trail = []  # Nothing before the search is ever undone
         return self.backtrack(dict())
 
     def enforce_node_consistency(self):
@@ -101,7 +154,7 @@ class CrosswordCreator():
         for variable in self.crossword.variables:
             for word in self.domains[variable].copy():
                 if len(word) != variable.length and word in self.domains[variable]:
-                    self.domains[variable].remove(word)
+                    self.remove_word(variable, word)
 
     def revise(self, x, y):
         # Make variable `x` arc consistent with variable `y`.
@@ -112,27 +165,23 @@ class CrosswordCreator():
         # False if no revision was made.
         
         revised = False
-        
+        overlap = self.crossword.overlaps[x, y]
+
         for word in self.domains[x].copy():
-            if word in self.domains[x]:
-                overlap = self.crossword.overlaps[x, y]
-
-                if overlap == None:
-                    if len(self.domains[y]) == 1 and word in self.domains[y]:
-                        # Not consistent because the only assignable word for y variable is the same as the word we're checking
-                        self.domains[x].remove(word)
-                        revised = True
-                else:
-                    isPossible = False  # True means that the word we're checking do have a possible corresponding value for y variable, False means that the current word cause arc inconsistency
-                    
-                    for value in self.domains[y]:
-                        if word[overlap[0]] == value[overlap[1]] and word != value:
-                            isPossible = True
-
-                    if not isPossible:
-                        self.domains[x].remove(word)
-                        revised = True
-            
+            if overlap == None:
+                if len(self.domains[y]) == 1 and word in self.domains[y]:
+                    # Not consistent because the only assignable word for y variable is the same as the word we're checking
+                    self.remove_word(x, word)
+                    revised = True
+            else:
+                # Words of y with the same letter in the overlap place, looked up in y's index instead of scanning its domain
+                supporting = self.word_index(y).get((overlap[1], word[overlap[0]]), ())
+
+                # The word is possible if any of them is a different word
+                if len(supporting) - (word in supporting) == 0:
+                    self.remove_word(x, word)
+                    revised = True
+
         return revised
 
     def ac3(self, arcs=None):
@@ -143,35 +192,32 @@ class CrosswordCreator():
         # Return True if arc consistency is enforced and no domains are empty;
         # return False if one or more domains end up empty.
 
-        queue = list()
+        if arcs == None:
+            arcs = [
+                (x, y)
+                for x in self.crossword.variables
+                for y in self.neighbors[x]
+            ]
 
-        if arcs != None:
-            queue = arcs
-        else:
-            for x in self.crossword.variables:
-                for y in self.crossword.variables:
-                    if x != y:
-                        queue.append((x, y))
+        queue = collections.deque(arcs)
+        queued = set(queue)  # Arcs waiting in the queue, so none is added twice
 
-        while True:
-            x = queue[0][0]
-            y = queue[0][1]
-            queue.remove(queue[0])
+        while queue:
+            x, y = queue.popleft()
+            queued.discard((x, y))
 
             if self.revise(x, y):
                 if len(self.domains[x]) == 0:
                     return False
 
-                # If revise method update `self.domains[x]` add all arcs which have the x variable to the queue to ensure arc consistency
-                for var in self.crossword.variables:
-                    if var.__eq__(x):
-                        continue
-                    
-                    queue.append((x, var))
+                # Only words of x's neighbors may have lost their support, so requeue
+                # the arcs towards x, except the one from y, which x was revised against
+                for z in self.neighbors[x]:
+                    if z != y and (z, x) not in queued:
+                        queue.append((z, x))
+                        queued.add((z, x))
 
-            elif len(queue) == 0:
-                # It will only be arc consistent when the revise method doesn't update `self.domains[x]` and the queue is empty
-                return True
+        return True
 
     def assignment_complete(self, assignment):
         # Return True if `assignment` is complete (i.e., assigns a value to each
@@ -200,7 +246,7 @@ class CrosswordCreator():
                 # Not consistent because the value has the incorrect length
                 return False
             
-            for neighbor in self.crossword.neighbors(variable):
+            for neighbor in self.neighbors[variable]:
                 if neighbor in assignment:
                     overlap = self.crossword.overlaps[variable, neighbor]
                     if assignment[variable][overlap[0]] != assignment[neighbor][overlap[1]]:
@@ -219,7 +265,7 @@ class CrosswordCreator():
 
         for value in self.domains[var]:
             heuristics[value] = 0
-            for variable in self.crossword.neighbors(var):
+            for variable in self.neighbors[var]:
                 if variable in assignment:
                     continue
 
@@ -254,11 +300,11 @@ class CrosswordCreator():
                 # If this variable has the lowest heuristic value restart `heuristics` with it
                 if heuristic < lowestHeuristic:  
                     heuristics = dict()
-                    heuristics[var] = len(self.crossword.neighbors(var))
+                    heuristics[var] = len(self.neighbors[var])
                     lowestHeuristic = heuristic
                 # If this variable has the same heuristic value as other(s) varible(s) with the lowest heuristic value add it in `heuristics`
                 elif heuristic == lowestHeuristic:
-                    heuristics[var] = len(self.crossword.neighbors(var))
+                    heuristics[var] = len(self.neighbors[var])
         
         if len(heuristics) == 1:  # If there's no tie between variables in the first heuristic values return the variible with the minimum number of remaining values in its domain
             return list(heuristics.keys())[0]
@@ -286,26 +332,24 @@ class CrosswordCreator():
 
             # If value is node consistent with the assignment check arc consistency of all arcs that contains the selected variable assuming that the value are assigned to the variable
             if self.consistent(newAssignment):
-                backup = self.domains[var].copy()
-                self.domains[var] = [value]
-
-                arcs = list()
+                mark = len(self.trail)
+                for word in self.domains[var].copy():
+                    if word != value:
+                        self.remove_word(var, word)
 
-                for y in self.crossword.variables:
-                    if var != y:
-                        arcs.append((var, y))
+                # Only the neighbors of the selected variable are constrained by its new value
+                arcs = [(y, var) for y in self.neighbors[var] if y not in assignment]
 
-                # If have arc consistency call recurssively backtrack with the new assignment, else try another value
+                # If have arc consistency call recurssively backtrack with the new assignment
                 if self.ac3(arcs):
                     result = self.backtrack(newAssignment)
 
-                    # If backtrack return a solution return it, else try another value
+                    # If backtrack return a solution return it
                     if result != None:
                         return result
-                    else:
-                        self.domains[var] = backup.copy()
-                else:
-                    self.domains[var] = backup.copy()
+
+                # Else put back the words the propagation pruned and try another value
+                self.undo(mark)
         
         return None
 